@@ -0,0 +1,285 @@
+"""
+Local benchmarks for the Enigma engine, its components, the plugboard stage of the
+attack, the web endpoint and the cold start of the Lambda handlers.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json
+
+Nothing here touches the network; the web endpoint is driven through TestClient and
+cold starts are measured by sending one event to the handler in fresh processes.
+The 100 MB process case needs a few GB of memory; lower it with --max-size.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from enigma.machine import Enigma  # noqa: E402
+from enigma.plugboard import Plugboard  # noqa: E402
+from enigma.rotor import Rotor  # noqa: E402
+from lambda_handler import batch_job, http_event  # noqa: E402
+
+SETTINGS = (["I", "II", "III"], "aaa", "aaa", "B", "ab cd ef gh ij kl")
+SIZE_UNITS = {"b": 1, "kb": 1 << 10, "mb": 1 << 20, "gb": 1 << 30}
+FORM = {
+    "plaintext": "The quick brown fox jumps over the lazy dog. " * 20,
+    "left_rotor": "I",
+    "center_rotor": "II",
+    "right_rotor": "III",
+    "left_initial_position": "A",
+    "center_initial_position": "A",
+    "right_initial_position": "A",
+    "left_ring_setting": "A",
+    "center_ring_setting": "A",
+    "right_ring_setting": "A",
+    "reflector": "B",
+    "plugboard_connections": "AB CD",
+}
+
+JOB = batch_job(FORM["plaintext"])
+
+# Run in a fresh interpreter: import a handler module, send it one event and print the
+# seconds taken from the first import to the response
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+module = __import__(sys.argv[1])
+module.handler(json.loads(sys.argv[2]), None)
+print(time.perf_counter() - start)
+"""
+
+
+def parse_size(text):
+    """
+    Parse a size such as "100MB" or "4096".
+
+    :param text: The size, with an optional unit (B, KB, MB or GB).
+    :return: The size in bytes.
+    """
+    text = text.strip().lower()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def result(value, unit, higher_is_better):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_process(max_size, min_time):
+    """
+    Letters per second of Enigma.process for inputs from 1 B up to max_size, growing 100x at a time.
+    """
+    results = {}
+    size = 1
+    while size <= max_size:
+        text = ("theenigmamachine" * (size // 16 + 1))[:size]
+        runs = 0
+        elapsed = 0.0
+        while elapsed < min_time or runs == 0:
+            enigma = Enigma(*SETTINGS)
+            start = time.perf_counter()
+            enigma.process(text)
+            elapsed += time.perf_counter() - start
+            runs += 1
+        results[f"process.{size}B.letters_per_second"] = result(size * runs / elapsed, "letters/s", True)
+        size *= 100
+    return results
+
+
+def bench_components(min_time):
+    """
+    Per-call cost of the machine's building blocks.
+    """
+    enigma = Enigma(*SETTINGS)
+    rotor = Rotor("II", "c", "b")
+    plugboard = Plugboard("ab cd ef gh ij kl")
+    calls = {
+        "enigma.step_rotors": enigma.step_rotors,
+        "rotor.encode_forward": lambda: rotor.encode_forward("q"),
+        "rotor.encode_backward": lambda: rotor.encode_backward("q"),
+        "plugboard.swap": lambda: plugboard.swap("c"),
+        "enigma.construct": lambda: Enigma(*SETTINGS),
+    }
+    results = {}
+    for name, call in calls.items():
+        timer = timeit.Timer(call)
+        number, _ = timer.autorange()
+        number = max(number, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=5, number=number)) / number
+        results[f"{name}.seconds_per_call"] = result(best, "s", False)
+    return results
+
+
+def bench_attack(min_time):
+    """
+    Seconds per plugboard recovery (climb_plugboard) with the rotor settings known,
+    for short and long messages, with a trigram model trained on the README.
+    """
+    from enigma.attack import climb_plugboard, keystroke_permutations
+    from enigma.scoring import NgramModel, letter_indices
+    from enigma.table import keystroke_table, state_index
+
+    with open(os.path.join(ROOT, "README.md")) as file:
+        corpus = letter_indices(file.read())
+    model = NgramModel.from_text(''.join(chr(ord("a") + index) for index in corpus), 3)
+    table = keystroke_table(("I", "II", "III"), "aaa", "B", "")
+
+    results = {}
+    for length in (400, 2000):
+        plaintext = ''.join(chr(ord("a") + index) for index in corpus[:length])
+        ciphertext = letter_indices(Enigma(*SETTINGS).process(plaintext))
+        permutations = keystroke_permutations(table, state_index(0, 0, 0), len(ciphertext))
+        timer = timeit.Timer(lambda: climb_plugboard(ciphertext, permutations, model))
+        number = max(1, int(min_time / timer.timeit(number=1)))
+        best = min(timer.repeat(repeat=3, number=number)) / number
+        results[f"attack.climb_plugboard.{length}L.seconds_per_call"] = result(best, "s", False)
+    return results
+
+
+def bench_web(requests):
+    """
+    Requests per second and latency percentiles of POST / through TestClient.
+    """
+    from fastapi.testclient import TestClient
+
+    # The app finds its templates relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        from main import app
+
+        client = TestClient(app)
+        client.post("/", data=FORM)  # warm up templates and caches
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(requests):
+            sent = time.perf_counter()
+            response = client.post("/", data=FORM)
+            latencies.append(time.perf_counter() - sent)
+            response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    latencies.sort()
+    return {
+        "web.post.requests_per_second": result(requests / elapsed, "requests/s", True),
+        "web.post.p50_seconds": result(statistics.median(latencies), "s", False),
+        "web.post.p99_seconds": result(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], "s", False),
+    }
+
+
+def bench_startup(runs):
+    """
+    Cold start of the Lambda handlers: the time from importing the handler module to
+    answering the first event, and the wall time of the whole process, over fresh processes.
+    """
+    batch = http_event("POST", "/api/batch", json.dumps([JOB]))
+    cases = {
+        "lambda_handler.batch": ("lambda_handler", batch),
+        "main.batch": ("main", batch),
+        "main.page": ("main", http_event("GET", "/")),
+    }
+
+    results = {}
+    for name, (module, event) in cases.items():
+        first_response = []
+        wall = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, module, json.dumps(event)],
+                                    cwd=ROOT, capture_output=True, text=True, check=True)
+            wall.append(time.perf_counter() - start)
+            first_response.append(float(output.stdout))
+        results[f"startup.{name}.first_response_p50_seconds"] = result(statistics.median(first_response), "s", False)
+        results[f"startup.{name}.first_response_max_seconds"] = result(max(first_response), "s", False)
+        results[f"startup.{name}.process_p50_seconds"] = result(statistics.median(wall), "s", False)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline.
+
+    :return: A list of (name, baseline value, value, relative change) for regressions
+             beyond the tolerance.
+    """
+    regressions = []
+    for name, entry in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None or not reference["value"]:
+            continue
+        change = entry["value"] / reference["value"] - 1
+        worse = -change if entry["higher_is_better"] else change
+        marker = ""
+        if worse > tolerance:
+            regressions.append((name, reference["value"], entry["value"], change))
+            marker = "  REGRESSION"
+        print(f"{name:48} {reference['value']:14.6g} -> {entry['value']:14.6g} ({change:+.1%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local Enigma benchmarks.")
+    parser.add_argument("--max-size", default="100MB", help="largest Enigma.process input (default: 100MB)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum seconds measured per case (default: 0.5)")
+    parser.add_argument("--requests", type=int, default=500, help="POST / requests to send (default: 500)")
+    parser.add_argument("--runs", type=int, default=20, help="fresh processes per cold start case (default: 20)")
+    parser.add_argument("--only", nargs="+", choices=["process", "components", "attack", "web", "startup"],
+                        default=["process", "components", "attack", "web", "startup"], help="benchmark groups to run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results stored in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown before a result counts as a regression (default: 0.2)")
+    args = parser.parse_args()
+    # Resolve paths against the caller's directory before any benchmark runs
+    output = args.output and os.path.abspath(args.output)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+
+    results = {}
+    if "process" in args.only:
+        results.update(bench_process(parse_size(args.max_size), args.min_time))
+    if "components" in args.only:
+        results.update(bench_components(args.min_time))
+    if "attack" in args.only:
+        results.update(bench_attack(args.min_time))
+    if "web" in args.only:
+        results.update(bench_web(args.requests))
+    if "startup" in args.only:
+        results.update(bench_startup(args.runs))
+
+    for name, entry in results.items():
+        print(f"{name:48} {entry['value']:14.6g} {entry['unit']}")
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, file, indent=2)
+
+    if baseline_path:
+        with open(baseline_path) as file:
+            baseline = json.load(file)["results"]
+        print(f"\nCompared with {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
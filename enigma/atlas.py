@@ -0,0 +1,203 @@
+import argparse
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from itertools import permutations
+
+from enigma.engine import fast_stack, slow_stack
+from enigma.plugboard import Plugboard
+from enigma.reflector import Reflector, reflector_wiring
+from enigma.rotor import Rotor, all_rotor_orders, rotor_wiring
+from enigma.table import KEYSTROKE_TABLE_CACHE_SIZE, STATES, KeystrokeTable
+
+MAGIC = b"ENIGATLS"
+VERSION = 1
+
+# magic, version, rotor order count, reflector count, data offset
+HEADER = struct.Struct("<8sHHHI")
+# one rotor order: three rotor numbers, NUL padded
+ORDER = struct.Struct("<4s4s4s")
+# one reflector type, NUL padded
+REFLECTOR = struct.Struct("<4s")
+
+# The data section starts on a page boundary
+DATA_ALIGNMENT = 4096
+
+PADDING = bytes(range(26, 256))
+
+
+def _order_rows(rotors, reflector):
+    # The unplugged permutation for every offset state of one rotor order and reflector,
+    # in state order. The left/middle/reflector composite is shared by 26 right offsets.
+    left, middle, right = (rotor_wiring(number) for number in rotors)
+    reflector = reflector_wiring(reflector).table + PADDING
+    rows = bytearray()
+    for left_offset in range(26):
+        for middle_offset in range(26):
+            composite = slow_stack(left, middle, reflector, left_offset, middle_offset)
+            for right_offset in range(26):
+                rows += fast_stack(right, composite, right_offset)
+    return rows
+
+
+def build_atlas(path, rotor_orders=None, reflectors=None):
+    """
+    Precompute the unplugged letter permutation for every rotor order, reflector and
+    rotor offset state, and write them to a binary atlas file.
+
+    States are indexed by rotor offsets (position minus ring setting), which is all the
+    permutation depends on, so one atlas serves every ring setting and start position.
+
+    :param path: Path of the file to write.
+    :param rotor_orders: Rotor orders to include (defaults to all_rotor_orders()).
+    :param reflectors: Reflector types to include (defaults to all of them).
+    """
+    rotor_orders = [tuple(order) for order in (rotor_orders or all_rotor_orders())]
+    reflectors = list(reflectors or Reflector.REFLECTOR_CONFIGS)
+
+    header = bytearray(HEADER.size)
+    for order in rotor_orders:
+        header += ORDER.pack(*(number.encode('ascii') for number in order))
+    for reflector in reflectors:
+        header += REFLECTOR.pack(reflector.encode('ascii'))
+    data_offset = -(-len(header) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    HEADER.pack_into(header, 0, MAGIC, VERSION, len(rotor_orders), len(reflectors), data_offset)
+    header += bytes(data_offset - len(header))
+
+    with open(path, 'wb') as file:
+        file.write(header)
+        for order in rotor_orders:
+            for reflector in reflectors:
+                file.write(_order_rows(order, reflector))
+
+
+class Atlas:
+    """
+    A read-only, memory-mapped keystroke permutation atlas written by build_atlas.
+    Opening it only parses the small index header; permutations are read straight
+    from the mapping, so processes that open the same file share it through the
+    page cache.
+    """
+
+    def __init__(self, path):
+        """
+        Open an atlas file.
+
+        :param path: Path of the atlas file.
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError("Not a keystroke atlas file (too short)")
+            self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, order_count, reflector_count, self.data_offset = HEADER.unpack_from(self.mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mapped.close()
+            raise ValueError("Not a keystroke atlas file (or an unsupported version)")
+        index_size = HEADER.size + order_count * ORDER.size + reflector_count * REFLECTOR.size
+        expected = self.data_offset + order_count * reflector_count * STATES * 26
+        if self.data_offset < index_size or len(self.mapped) < expected:
+            size = len(self.mapped)
+            self.mapped.close()
+            raise ValueError(f"Truncated keystroke atlas file: expected {expected} bytes, got {size}")
+
+        offset = HEADER.size
+        self.rotor_orders = {}
+        for index in range(order_count):
+            order = tuple(number.rstrip(b'\0').decode('ascii') for number in ORDER.unpack_from(self.mapped, offset))
+            self.rotor_orders[order] = index
+            offset += ORDER.size
+        self.reflectors = {}
+        for index in range(reflector_count):
+            reflector = REFLECTOR.unpack_from(self.mapped, offset)[0].rstrip(b'\0').decode('ascii')
+            self.reflectors[reflector] = index
+            offset += REFLECTOR.size
+
+        self._tables = OrderedDict()
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        self.mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _block_start(self, rotors, reflector):
+        # File offset of the permutations of one rotor order and reflector
+        try:
+            index = self.rotor_orders[tuple(rotors)] * len(self.reflectors) + self.reflectors[reflector]
+        except KeyError:
+            raise KeyError(f"Rotor order {tuple(rotors)} with reflector {reflector} is not in the atlas") from None
+        return self.data_offset + index * STATES * 26
+
+    def block(self, rotors, reflector):
+        """
+        Return the permutations of one rotor order and reflector, without copying.
+        Release the view before closing the atlas.
+
+        :param rotors: A tuple of three rotor number strings (left, middle, right).
+        :param reflector: A reflector string (e.g., "B").
+        :return: A memoryview of STATES * 26 bytes; state s occupies bytes [26 * s, 26 * s + 26).
+        """
+        start = self._block_start(rotors, reflector)
+        return memoryview(self.mapped)[start:start + STATES * 26]
+
+    def permutation(self, rotors, reflector, offset_state):
+        """
+        Return the unplugged permutation for a rotor offset state.
+
+        :param rotors: A tuple of three rotor number strings (left, middle, right).
+        :param reflector: A reflector string (e.g., "B").
+        :param offset_state: The state number of the rotor offsets (position minus ring).
+        :return: A 26-byte bytes object mapping each input index to its output index.
+        """
+        start = self._block_start(rotors, reflector) + offset_state * 26
+        return self.mapped[start:start + 26]
+
+    def keystroke_table(self, rotors, ring_settings, reflector, plugboard_connections):
+        """
+        Return a keystroke table for a machine key whose permutations are read from
+        the atlas instead of being computed. Recently used tables are kept.
+        Arguments are as for enigma.table.keystroke_table.
+
+        :return: A KeystrokeTable.
+        """
+        key = (tuple(rotors), ring_settings, reflector, plugboard_connections)
+        table = self._tables.get(key)
+        if table is None:
+            # Fail early for keys the atlas does not cover
+            self._block_start(rotors, reflector)
+            table = KeystrokeTable(
+                [Rotor(number, "a", ring) for number, ring in zip(rotors, ring_settings)],
+                Reflector(reflector),
+                Plugboard(plugboard_connections),
+                atlas=self,
+            )
+            self._tables[key] = table
+            if len(self._tables) > KEYSTROKE_TABLE_CACHE_SIZE:
+                self._tables.popitem(last=False)
+        else:
+            self._tables.move_to_end(key)
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a keystroke permutation atlas.")
+    parser.add_argument("path", help="output file")
+    parser.add_argument("--rotors", nargs="+", default=list(Rotor.ROTOR_CONFIGS),
+                        help="rotors to combine into orders (default: all)")
+    parser.add_argument("--reflectors", nargs="+", default=list(Reflector.REFLECTOR_CONFIGS),
+                        help="reflector types (default: all)")
+    args = parser.parse_args()
+
+    build_atlas(args.path, list(permutations(args.rotors, 3)), args.reflectors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+import heapq
+import os
+import string
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from enigma.kernel import score_keys, state_keys
+from enigma.plugboard import PlugboardHypothesis
+from enigma.rotor import all_rotor_orders
+from enigma.scoring import RunningScore, letter_indices
+from enigma.table import STATES, keystroke_table, state_index, state_positions
+from enigma.vectorized import np
+
+ALPHABET = string.ascii_lowercase
+
+# A ranked attack result: the n-gram score of the decryption, the recovered machine
+# settings (ring settings and start positions as letter strings, e.g., "abc") and the
+# decrypted text.
+Candidate = namedtuple('Candidate', ['score', 'rotors', 'reflector', 'ring_settings', 'positions',
+                                     'plugboard', 'plaintext'])
+
+
+def index_of_coincidence(indices):
+    """
+    The probability that two letters drawn at random from a text are the same. It is
+    about 0.038 for random letters and markedly higher for natural language.
+
+    :param indices: A sequence of alphabet indices (0-25).
+    :return: The index of coincidence.
+    """
+    counts = [0] * 26
+    for index in indices:
+        counts[index] += 1
+    total = len(indices)
+    if total < 2:
+        return 0.0
+    return sum(count * (count - 1) for count in counts) / (total * (total - 1))
+
+
+def keystroke_permutations(table, start, length):
+    """
+    Collect the permutations a keystroke table applies to a message, without
+    enciphering anything.
+
+    :param table: A KeystrokeTable.
+    :param start: The state number of the start positions.
+    :param length: The number of letters in the message.
+    :return: A list with the permutation used for each letter.
+    """
+    steps = table.steps
+    permutation = table.permutation
+    permutations = []
+    state = start
+    for _ in range(length):
+        # Rotors step before each letter
+        state = steps[state]
+        permutations.append(permutation(state))
+    return permutations
+
+
+def _unplugged_ioc(table, start, ciphertext):
+    # Index of coincidence of the decryption without a plugboard, walked straight
+    # through the table instead of building a machine
+    steps = table.steps
+    permutation = table.permutation
+    counts = [0] * 26
+    state = start
+    for index in ciphertext:
+        state = steps[state]
+        counts[permutation(state)[index]] += 1
+    total = len(ciphertext)
+    return sum(count * (count - 1) for count in counts) / max(total * (total - 1), 1)
+
+
+def _search_positions(ciphertext, rotors, reflector, states, keep):
+    # Rank start states by the index of coincidence of the unplugged decryption,
+    # all at once with the batched kernel when NumPy is available
+    if np is not None:
+        scores = score_keys(ciphertext, state_keys(rotors, reflector, states))
+        return heapq.nlargest(keep, zip(scores.tolist(), states))
+    table = keystroke_table(rotors, "aaa", reflector, "")
+    return heapq.nlargest(keep, ((_unplugged_ioc(table, start, ciphertext), start) for start in states))
+
+
+def _search_rings(ciphertext, rotors, reflector, start):
+    # Only the middle and right ring settings change the stepping. Moving a ring and
+    # the rotor position together keeps the rotor offsets, so each ring is tried with
+    # the position that preserves them, right rotor first.
+    left, middle, right = state_positions(start)
+    rings = [0, 0, 0]
+    best = None
+    for rotor in (2, 1):
+        for ring in range(26):
+            trial = list(rings)
+            trial[rotor] = ring
+            table = keystroke_table(rotors, ''.join(ALPHABET[ring] for ring in trial), reflector, "")
+            trial_start = state_index(left, (middle + trial[1]) % 26, (right + trial[2]) % 26)
+            score = _unplugged_ioc(table, trial_start, ciphertext)
+            if best is None or score > best[0]:
+                best = (score, trial, trial_start)
+        _, rings, _ = best
+    _, rings, start = best
+    return ''.join(ALPHABET[ring] for ring in rings), start
+
+
+def _decrypt(permutations, ciphertext, plugboard):
+    return [plugboard[permutation[plugboard[index]]] for permutation, index in zip(permutations, ciphertext)]
+
+
+def _move(plugboard, first, second):
+    # The hill-climbing move for a letter pair: disconnect them if they are connected,
+    # connect them if both are free, and re-pair them otherwise
+    table = plugboard.table
+    if table[first] == second:
+        return plugboard.disconnect(first)
+    if table[first] == first and table[second] == second:
+        return plugboard.connect(first, second)
+    return plugboard.swap(first, second)
+
+
+def _moves(plugboard, max_pairs, seen):
+    # The letter pairs whose move (see _move) can change the decryption: connections
+    # only while pairs are left, and never moves that only touch letters in no position.
+    # Re-pairing two connected letters also connects their partners, so of the two
+    # pairs giving the same plugboard only the one with the lowest letter is kept.
+    table = plugboard.table
+    moves = []
+    for first in range(26):
+        first_partner = table[first]
+        for second in range(first + 1, 26):
+            second_partner = table[second]
+            if first_partner == first and second_partner == second:
+                if plugboard.pairs >= max_pairs or not (seen[first] or seen[second]):
+                    continue
+            elif first_partner != second and first_partner != first and second_partner != second:
+                if min(first_partner, second_partner) < first:
+                    continue
+            elif not (seen[first] or seen[second] or seen[first_partner] or seen[second_partner]):
+                continue
+            moves.append((first, second))
+    return moves
+
+
+def _decrypt_all(ciphertext, unplugged, tables):
+    # The decryption under each plugboard table (one per row), with the unplugged
+    # permutations as an array with one row per position
+    entering = tables[:, ciphertext]
+    return np.take_along_axis(tables, unplugged[np.arange(len(ciphertext)), entering], axis=1)
+
+
+def _climb_batched(ciphertext, permutations, model, max_pairs, plugboard):
+    # climb_plugboard with NumPy: each round decrypts and scores the text under every
+    # move at once, in batches of about a million letters
+    ciphertext = np.asarray(ciphertext, dtype=np.intp)
+    unplugged = np.frombuffer(b''.join(bytes(permutation) for permutation in permutations),
+                              dtype=np.uint8).reshape(len(ciphertext), 26)
+    batch = max(1, (1 << 20) // max(len(ciphertext), 1))
+
+    table = np.frombuffer(bytes(plugboard.table), dtype=np.uint8)
+    score = float(model.score_array(_decrypt_all(ciphertext, unplugged, table[np.newaxis]))[0])
+    while True:
+        # Letters at some position: in the ciphertext, or leaving the rotors
+        middle = unplugged[np.arange(len(ciphertext)), table[ciphertext]]
+        seen = (np.bincount(np.concatenate((ciphertext, middle)), minlength=26) > 0).tolist()
+        moves = _moves(plugboard, max_pairs, seen)
+
+        best = None
+        for offset in range(0, len(moves), batch):
+            tables = []
+            for first, second in moves[offset:offset + batch]:
+                trial = plugboard.copy()
+                _move(trial, first, second)
+                tables.append(trial.table)
+            scores = model.score_array(_decrypt_all(
+                ciphertext, unplugged, np.frombuffer(b''.join(tables), dtype=np.uint8).reshape(-1, 26)))
+            index = int(scores.argmax())
+            if scores[index] > score + 1e-9 and (best is None or scores[index] > best[0]):
+                best = (float(scores[index]), offset + index)
+
+        if best is None:
+            return score, plugboard
+
+        score, index = best
+        _move(plugboard, *moves[index])
+        table = np.frombuffer(bytes(plugboard.table), dtype=np.uint8)
+
+
+def climb_plugboard(ciphertext, permutations, model, max_pairs=10, plugboard=None):
+    """
+    Recover plugboard pairs by steepest-ascent hill climbing on the n-gram score of
+    the decryption. Each round tries connecting two free letters, disconnecting a
+    pair and re-pairing letters, and keeps the best move until none improves. Moves
+    that cannot change the decryption are not tried.
+
+    With NumPy, every move of a round is scored at once. Otherwise a move only changes
+    the partners of up to four letters, so a trial rescores just the positions whose
+    ciphertext letter, or whose letter between the rotors and the plugboard on the way
+    out, is one of them.
+
+    :param ciphertext: The ciphertext as alphabet indices.
+    :param permutations: The unplugged permutation for each letter (see keystroke_permutations).
+    :param model: An enigma.scoring.NgramModel.
+    :param max_pairs: The maximum number of pairs to connect.
+    :param plugboard: An optional PlugboardHypothesis to start from (it is modified).
+    :return: A tuple (score, plugboard) with the final score and PlugboardHypothesis.
+    """
+    plugboard = plugboard or PlugboardHypothesis()
+    if np is not None:
+        return _climb_batched(ciphertext, permutations, model, max_pairs, plugboard)
+    table = plugboard.table
+
+    # For each position: the letter leaving the rotors, and the decrypted letter
+    middle = [permutation[table[index]] for permutation, index in zip(permutations, ciphertext)]
+    running = RunningScore(model, (table[letter] for letter in middle))
+    plaintext = running.indices
+
+    # Positions by ciphertext letter (fixed) and by letter leaving the rotors
+    by_cipher = [[] for _ in range(26)]
+    by_middle = [set() for _ in range(26)]
+    for position, (index, letter) in enumerate(zip(ciphertext, middle)):
+        by_cipher[index].append(position)
+        by_middle[letter].add(position)
+
+    def evaluate(changed):
+        # Decrypted letters that differ under the current table, at affected positions only
+        changes = {}
+        for letter in changed:
+            # Leaving the rotors on a letter that changed partner decrypts to the new partner
+            partner = table[letter]
+            for position in by_middle[letter]:
+                changes[position] = partner
+        for letter in changed:
+            # A ciphertext letter that changed partner goes through the rotors elsewhere
+            entering = table[letter]
+            for position in by_cipher[letter]:
+                decrypted = table[permutations[position][entering]]
+                if decrypted != plaintext[position]:
+                    changes[position] = decrypted
+                else:
+                    changes.pop(position, None)
+        return changes
+
+    while True:
+        best = None
+        for first, second in _moves(plugboard, max_pairs, [bool(cipher or positions)
+                                                           for cipher, positions in zip(by_cipher, by_middle)]):
+            # A move touches at most these letters; remember them to undo it
+            saved = [(letter, table[letter]) for letter in {first, second, table[first], table[second]}]
+            pairs = plugboard.pairs
+
+            gain = running.delta(evaluate(_move(plugboard, first, second)))
+            if gain > 1e-9 and (best is None or gain > best[0]):
+                best = (gain, first, second)
+
+            for letter, partner in saved:
+                table[letter] = partner
+            plugboard.pairs = pairs
+
+        if best is None:
+            return running.score, plugboard
+
+        _, first, second = best
+        changed = _move(plugboard, first, second)
+        running.apply(evaluate(changed))
+
+        # Positions whose ciphertext letter changed partner leave the rotors elsewhere
+        for letter in changed:
+            for position in by_cipher[letter]:
+                by_middle[middle[position]].discard(position)
+                middle[position] = permutations[position][table[letter]]
+                by_middle[middle[position]].add(position)
+
+
+def _attack_order(ciphertext, rotors, reflector, model, states, keep, max_pairs):
+    """
+    Run every attack stage for one rotor order and reflector.
+
+    :return: A list of Candidates, best first.
+    """
+    candidates = []
+    for _, start in _search_positions(ciphertext, rotors, reflector, states, keep):
+        ring_settings, start = _search_rings(ciphertext, rotors, reflector, start)
+        table = keystroke_table(rotors, ring_settings, reflector, "")
+        permutations = keystroke_permutations(table, start, len(ciphertext))
+        score, plugboard = climb_plugboard(ciphertext, permutations, model, max_pairs)
+
+        plaintext = ''.join(ALPHABET[index] for index in _decrypt(permutations, ciphertext, plugboard.table))
+        candidates.append(Candidate(score, rotors, reflector, ring_settings,
+                                    ''.join(ALPHABET[position] for position in state_positions(start)),
+                                    plugboard.connections, plaintext))
+    candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+    return candidates
+
+
+def attack(ciphertext, model, rotor_orders=None, reflectors=("B",), positions=None,
+           best=5, keep=3, max_pairs=10, workers=None):
+    """
+    Ciphertext-only attack. For each rotor order and reflector, start positions are
+    ranked by the index of coincidence of the decryption without a plugboard, the
+    ring settings of the leading positions are refined the same way, and plugboard
+    pairs are then recovered by hill climbing on n-gram scores. Candidates are
+    evaluated with the batched kernel or on cached keystroke tables, and rotor orders
+    are searched in parallel.
+
+    This is a generator: each time a finished candidate enters the best `best` seen so
+    far it is yielded, so callers can report progress or stop early.
+
+    :param ciphertext: The intercepted ciphertext; non-letters are ignored.
+    :param model: An enigma.scoring.NgramModel of the expected plaintext language.
+    :param rotor_orders: Rotor orders to try (defaults to all sixty).
+    :param reflectors: Reflector types to try.
+    :param positions: Optional start positions (with rings "aaa") to restrict the search to.
+    :param best: The number of best candidates to keep.
+    :param keep: The number of start positions per rotor order to carry into the later stages.
+    :param max_pairs: The maximum number of plugboard pairs to recover.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :return: A generator of Candidates.
+    """
+    ciphertext = letter_indices(ciphertext)
+    if positions is None:
+        states = range(STATES)
+    else:
+        states = [state_index(*(ALPHABET.index(letter) for letter in position)) for position in positions]
+
+    tasks = [(tuple(order), reflector) for order in (rotor_orders or all_rotor_orders()) for reflector in reflectors]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    top = []
+    counter = 0
+
+    def admit(candidates):
+        # Keep the running best as a min-heap; report the candidates that get in
+        nonlocal counter
+        admitted = []
+        for candidate in candidates:
+            entry = (candidate.score, counter, candidate)
+            counter += 1
+            if len(top) < best:
+                heapq.heappush(top, entry)
+            elif candidate.score > top[0][0]:
+                heapq.heapreplace(top, entry)
+            else:
+                continue
+            admitted.append(candidate)
+        return admitted
+
+    if workers == 1:
+        for rotors, reflector in tasks:
+            yield from admit(_attack_order(ciphertext, rotors, reflector, model, states, keep, max_pairs))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_attack_order, ciphertext, rotors, reflector, model, states, keep, max_pairs)
+                   for rotors, reflector in tasks]
+        try:
+            for future in as_completed(futures):
+                yield from admit(future.result())
+        finally:
+            # Stop queued work if the caller stops early
+            for future in futures:
+                future.cancel()
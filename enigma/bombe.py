@@ -0,0 +1,191 @@
+import os
+import string
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from enigma.rotor import all_rotor_orders
+from enigma.table import STATES, keystroke_table, positions_after, state_index, state_positions
+
+ALPHABET = string.ascii_lowercase
+
+# A surviving bombe stop: rotor order, reflector, start positions (e.g., "ajd") and the
+# plugboard pairs deduced from the menu (e.g., "ab cd").
+Stop = namedtuple('Stop', ['rotors', 'reflector', 'positions', 'steckers'])
+
+
+class Menu:
+    """
+    The letter menu of a crib: a graph whose nodes are letters and whose edges join
+    each crib letter to its ciphertext letter, labelled with the keystroke offset.
+    """
+
+    def __init__(self, ciphertext, crib, offset=0):
+        """
+        Build the menu.
+
+        :param ciphertext: The intercepted ciphertext (letters only, in either case).
+        :param crib: The guessed plaintext (letters only, in either case).
+        :param offset: Position of the crib in the ciphertext.
+        """
+        ciphertext = ciphertext.lower()
+        crib = crib.lower()
+        for name, text in (("Ciphertext", ciphertext), ("Crib", crib)):
+            for position, letter in enumerate(text):
+                if letter not in ALPHABET:
+                    raise ValueError(f"{name} character {letter!r} at {position} is not a letter")
+        if offset < 0 or offset + len(crib) > len(ciphertext):
+            raise ValueError("Crib does not fit in the ciphertext at this offset")
+
+        self.offset = offset
+        self.length = len(crib)
+        self.edges = [[] for _ in ALPHABET]
+        for position, (plain, cipher) in enumerate(zip(crib, ciphertext[offset:])):
+            plain, cipher = ALPHABET.index(plain), ALPHABET.index(cipher)
+            if plain == cipher:
+                # An Enigma never enciphers a letter to itself
+                raise ValueError(f"Crib letter {ALPHABET[plain]!r} clashes with the ciphertext at {position}")
+            self.edges[plain].append((cipher, position))
+            self.edges[cipher].append((plain, position))
+
+        # Connected components, largest first; each has a test letter with the most edges
+        self.components = []
+        seen = set()
+        for letter in range(26):
+            if letter in seen or not self.edges[letter]:
+                continue
+            component = []
+            stack = [letter]
+            seen.add(letter)
+            while stack:
+                node = stack.pop()
+                component.append(node)
+                for other, _ in self.edges[node]:
+                    if other not in seen:
+                        seen.add(other)
+                        stack.append(other)
+            self.components.append(sorted(component, key=lambda node: -len(self.edges[node])))
+        self.components.sort(key=len, reverse=True)
+
+    @property
+    def loops(self):
+        """The number of independent loops (closed cycles) in the menu."""
+        edge_count = sum(len(edges) for edges in self.edges) // 2
+        node_count = sum(len(component) for component in self.components)
+        return edge_count - node_count + len(self.components)
+
+
+def _propagate(menu, permutations, stecker, letter, partner):
+    """
+    Assume `letter` is steckered to `partner` and follow the consequences through the
+    menu, with the diagonal board (x steckered to y means y is steckered to x).
+
+    :return: False on a contradiction; otherwise True, with `stecker` extended.
+    """
+    pending = [(letter, partner)]
+    while pending:
+        letter, partner = pending.pop()
+        if stecker[letter] == partner:
+            continue
+        if stecker[letter] != -1 or stecker[partner] not in (-1, letter):
+            return False
+        stecker[letter] = partner
+        stecker[partner] = letter
+
+        # The ciphertext letter across an edge is steckered to the scrambled partner
+        for other, position in menu.edges[letter]:
+            pending.append((other, permutations[position][partner]))
+        if partner != letter:
+            for other, position in menu.edges[partner]:
+                pending.append((other, permutations[position][letter]))
+    return True
+
+
+def _solve(menu, permutations, stecker, components):
+    """
+    Find a stecker hypothesis consistent with every remaining menu component.
+
+    :return: The completed stecker list, or None if every hypothesis fails.
+    """
+    if not components:
+        return stecker
+    test_letter = components[0][0]
+    if stecker[test_letter] != -1:
+        return _solve(menu, permutations, stecker, components[1:])
+    for partner in range(26):
+        candidate = list(stecker)
+        if _propagate(menu, permutations, candidate, test_letter, partner):
+            solution = _solve(menu, permutations, candidate, components[1:])
+            if solution is not None:
+                return solution
+    return None
+
+
+def _sweep(menu, rotors, reflector, ring_settings, states):
+    """
+    Test every start state of one rotor order and reflector against the menu.
+
+    :return: A list of Stops.
+    """
+    table = keystroke_table(tuple(rotors), ring_settings, reflector, "")
+    steps = table.steps
+    _, middle, right = table.rotors
+
+    stops = []
+    for start in states:
+        # Rotor state at each crib letter, reached in constant time
+        state = state_index(*positions_after(*state_positions(start), middle.notch_index,
+                                             right.notch_index, menu.offset + 1))
+        permutations = []
+        for _ in range(menu.length):
+            permutations.append(table.permutation(state))
+            state = steps[state]
+
+        stecker = _solve(menu, permutations, [-1] * 26, menu.components)
+        if stecker is not None:
+            pairs = sorted({ALPHABET[min(a, b)] + ALPHABET[max(a, b)]
+                            for a, b in enumerate(stecker) if b not in (-1, a)})
+            stops.append(Stop(tuple(rotors), reflector,
+                              ''.join(ALPHABET[position] for position in state_positions(start)),
+                              ' '.join(pairs)))
+    return stops
+
+
+def run_bombe(ciphertext, crib, offset=0, rotor_orders=None, reflectors=("B",),
+              ring_settings="aaa", positions=None, workers=None):
+    """
+    Search for machine settings consistent with a crib, in the manner of the
+    Turing-Welchman bombe: for every rotor order, reflector and start position, each
+    plugboard hypothesis for the menu's test letter is followed through the menu, and
+    positions where every hypothesis leads to a contradiction are rejected.
+
+    Rotor orders are swept in parallel. The stepping is that of
+    enigma.stepping.positions_after, with the given ring settings.
+
+    :param ciphertext: The intercepted ciphertext (letters only).
+    :param crib: The guessed plaintext.
+    :param offset: Position of the crib in the ciphertext.
+    :param rotor_orders: Rotor orders to try (defaults to all sixty).
+    :param reflectors: Reflector types to try.
+    :param ring_settings: Ring settings assumed during the sweep (e.g., "aaa").
+    :param positions: Optional start positions to restrict the sweep to (e.g., ["aaa", "ajd"]).
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :return: A list of surviving Stops.
+    """
+    menu = Menu(ciphertext, crib, offset)
+    if positions is None:
+        states = range(STATES)
+    else:
+        states = [state_index(*(ALPHABET.index(letter) for letter in position)) for position in positions]
+
+    tasks = [(tuple(order), reflector) for order in (rotor_orders or all_rotor_orders()) for reflector in reflectors]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers == 1:
+        results = [_sweep(menu, rotors, reflector, ring_settings, states) for rotors, reflector in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_sweep, menu, rotors, reflector, ring_settings, states)
+                       for rotors, reflector in tasks]
+            results = [future.result() for future in futures]
+
+    return [stop for stops in results for stop in stops]
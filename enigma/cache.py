@@ -0,0 +1,102 @@
+import string
+import threading
+from collections import OrderedDict
+
+from enigma.machine import Enigma
+
+ALPHABET = string.ascii_lowercase
+
+
+def normalize_settings(rotors, ring_settings, reflector, plugboard_connections):
+    """
+    Put machine settings (without positions) in a canonical, hashable form, so that
+    equivalent spellings of a key share a cache entry.
+
+    :param rotors: A list of three rotor number strings [left, middle, right].
+    :param ring_settings: A list of three ring setting strings [left, middle, right].
+    :param reflector: A reflector string (e.g., "B").
+    :param plugboard_connections: Space-separated letter pairs (e.g., "AB CD").
+    :return: A tuple (rotors, ring_settings, reflector, plugboard_connections).
+    """
+    # Rings are joined into one string, so check them here: ["aa", "b", ""] must not pass as "aab"
+    if len(ring_settings) != 3 or any(len(ring) != 1 or ring.lower() not in ALPHABET for ring in ring_settings):
+        raise ValueError(f"Expected three single-letter ring settings, got {list(ring_settings)!r}")
+    pairs = plugboard_connections.lower().split(" ") if plugboard_connections else []
+    return (
+        tuple(rotors),
+        ''.join(ring_settings).lower(),
+        reflector,
+        ' '.join(sorted(''.join(sorted(pair)) for pair in pairs)),
+    )
+
+
+class MachineCache:
+    """
+    A bounded, thread-safe LRU cache of prebuilt machines keyed by their settings.
+    Each lookup returns a clone of the prebuilt machine, so only the rotor positions
+    are set up per call.
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Initialize the cache.
+
+        :param maxsize: Maximum number of machine configurations kept.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._machines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rotors, initial_positions, ring_settings, reflector, plugboard_connections):
+        """
+        Return a machine for the given settings, at the given initial positions.
+        Arguments are the same as for Enigma.
+
+        :return: A new Enigma instance.
+        """
+        key = normalize_settings(rotors, ring_settings, reflector, plugboard_connections)
+
+        with self._lock:
+            prototype = self._machines.get(key)
+            if prototype is not None:
+                self._machines.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if prototype is None:
+            # Build outside the lock; invalid settings raise here and are not cached
+            prototype = Enigma(list(key[0]), "aaa", key[1], key[2], key[3])
+            with self._lock:
+                self._machines[key] = prototype
+                if len(self._machines) > self.maxsize:
+                    self._machines.popitem(last=False)
+
+        machine = prototype.clone()
+        machine.set_positions(initial_positions)
+        return machine
+
+    def info(self):
+        """
+        Return the cache statistics.
+
+        :return: A dict with hits, misses, size and maxsize.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._machines),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        """
+        Drop all cached machines and reset the statistics.
+        """
+        with self._lock:
+            self._machines.clear()
+            self.hits = 0
+            self.misses = 0
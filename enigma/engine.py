@@ -0,0 +1,161 @@
+import string
+from collections import namedtuple
+from functools import lru_cache
+
+from enigma.plugboard import plugboard_wiring
+from enigma.reflector import reflector_wiring
+from enigma.rotor import rotor_wiring
+from enigma.stepping import state_index, state_positions, step_table
+
+ALPHABET = string.ascii_lowercase
+LETTER_INDEX = {letter: index for index, letter in enumerate(ALPHABET)}
+IDENTITY = bytes(range(26))
+PADDING = bytes(range(26, 256))
+CONFIG_CACHE_SIZE = 256
+
+
+class MachineConfig(namedtuple('MachineConfig', ['rotors', 'rings', 'reflector', 'plugboard'])):
+    """
+    An immutable, compiled machine key: three RotorWirings [left, middle, right],
+    their ring settings as indices, a ReflectorWiring and a PlugboardWiring.
+    """
+
+    __slots__ = ()
+
+    def key(self):
+        """
+        Return the settings this config is compiled from, as accepted by
+        compile_config and enigma.table.keystroke_table.
+
+        :return: A tuple (rotors, ring_settings, reflector, plugboard_connections).
+        """
+        return (
+            tuple(rotor.number for rotor in self.rotors),
+            ''.join(ALPHABET[ring] for ring in self.rings),
+            self.reflector.reflector_type,
+            self.plugboard.connections,
+        )
+
+    def __reduce__(self):
+        # A config travels to worker processes as its settings and is compiled there,
+        # once per process, sharing the cached wiring
+        return compile_config, self.key()
+
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def compile_config(rotors, ring_settings, reflector, plugboard_connections):
+    """
+    Compile machine settings into an immutable MachineConfig, reusing a recently
+    compiled one for repeated settings. Arguments must be hashable.
+
+    :param rotors: A tuple of three rotor number strings (left, middle, right).
+    :param ring_settings: A string of three ring setting letters (e.g., "aaa").
+    :param reflector: A reflector string (e.g., "B").
+    :param plugboard_connections: Space-separated letter pairs (e.g., "ab cd").
+    :return: A MachineConfig.
+    """
+    rotors = tuple(rotor_wiring(number) for number in rotors)
+    rings = tuple(ALPHABET.index(ring) for ring in ring_settings)
+    if len(rotors) != 3 or len(rings) != 3:
+        raise ValueError("Expected three rotors and three ring settings")
+    return MachineConfig(rotors, rings, reflector_wiring(reflector), plugboard_wiring(plugboard_connections))
+
+
+def slow_stack(left, middle, reflector, left_offset, middle_offset):
+    """
+    Compose the middle rotor, left rotor and reflector into one permutation. It only
+    changes when the middle or left rotor moves, so it can be reused between steps.
+
+    :param left: The RotorWiring of the left rotor.
+    :param middle: The RotorWiring of the middle rotor.
+    :param reflector: The reflector wiring table, padded to 256 bytes.
+    :param left_offset: Position minus ring setting of the left rotor.
+    :param middle_offset: Position minus ring setting of the middle rotor.
+    :return: A bytes object mapping each contact entering the middle rotor to the
+             contact leaving it on the way back.
+    """
+    return (
+        IDENTITY
+        .translate(middle.shifted_forward[middle_offset % 26])
+        .translate(left.shifted_forward[left_offset % 26])
+        .translate(reflector)
+        .translate(left.shifted_backward[left_offset % 26])
+        .translate(middle.shifted_backward[middle_offset % 26])
+    )
+
+
+def fast_stack(right, composite, right_offset):
+    """
+    Compose the right rotor around a slow_stack composite: the permutation of the
+    rotors and reflector, without the plugboard, at one rotor state.
+
+    :param right: The RotorWiring of the right rotor.
+    :param composite: The slow_stack permutation of the other rotors and the reflector.
+    :param right_offset: Position minus ring setting of the right rotor.
+    :return: A 26-byte permutation of alphabet indices.
+    """
+    return (
+        IDENTITY
+        .translate(right.shifted_forward[right_offset % 26])
+        .translate(composite + PADDING)
+        .translate(right.shifted_backward[right_offset % 26])
+    )
+
+
+def encrypt(config, text, start_positions):
+    """
+    Encrypt or decrypt text with a compiled config, starting from the given rotor
+    positions. This is a pure function: nothing is mutated, so any number of threads
+    may share one config. Gives the same result as Enigma.process.
+
+    :param config: A MachineConfig.
+    :param text: The input text to process (string).
+    :param start_positions: Rotor positions [left, middle, right], as letters (e.g., "aaa")
+                            or indices (0-25).
+    :return: A tuple (output, positions, letters) with the processed text, the final
+             rotor positions as indices, which can be passed back in to continue the
+             message, and the number of letters enciphered.
+    """
+    left, middle, right = config.rotors
+    left_ring, middle_ring, right_ring = config.rings
+    plugboard = config.plugboard.table
+    reflector = config.reflector.table + PADDING
+    steps = step_table(middle.notch_index, right.notch_index)
+
+    state = state_index(*(
+        ALPHABET.index(position) if isinstance(position, str) else position
+        for position in start_positions
+    ))
+
+    # Middle rotor, left rotor and reflector, rebuilt only when the state of the left
+    # and middle rotors (the state divided by 26) changes
+    composite = None
+    slow_state = None
+
+    text = text.lower()
+    skipped = 0
+    output = []
+    for letter in text:
+        index = LETTER_INDEX.get(letter)
+
+        if index is None:
+            # Non-letter characters pass unchanged
+            output.append(letter)
+            skipped += 1
+            continue
+
+        # Step rotors before each letter
+        state = steps[state]
+        slow = state // 26
+        if slow != slow_state:
+            slow_state = slow
+            left_position, middle_position = divmod(slow, 26)
+            composite = slow_stack(left, middle, reflector,
+                                   left_position - left_ring, middle_position - middle_ring)
+
+        # The right rotor's position is the state modulo 26
+        right_offset = (state - right_ring) % 26
+        output.append(ALPHABET[plugboard[right.shifted_backward[right_offset][
+            composite[right.shifted_forward[right_offset][plugboard[index]]]]]])
+
+    return ''.join(output), state_positions(state), len(text) - skipped
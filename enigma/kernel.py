@@ -0,0 +1,174 @@
+import string
+from functools import lru_cache
+
+from enigma.plugboard import plugboard_wiring
+from enigma.reflector import Reflector, reflector_wiring
+from enigma.rotor import Rotor, rotor_wiring
+from enigma.scoring import letter_indices
+from enigma.vectorized import np, positions_grid, require_numpy
+
+ALPHABET = string.ascii_lowercase
+
+ROTOR_NUMBERS = tuple(Rotor.ROTOR_CONFIGS)
+REFLECTOR_TYPES = tuple(Reflector.REFLECTOR_CONFIGS)
+
+# Columns of a key row: rotor numbers (left, middle, right) as indices into ROTOR_NUMBERS,
+# the reflector as an index into REFLECTOR_TYPES, start positions, ring settings, and
+# the plugboard as a 26-entry table.
+ROTOR_COLUMNS = slice(0, 3)
+REFLECTOR_COLUMN = 3
+POSITION_COLUMNS = slice(4, 7)
+RING_COLUMNS = slice(7, 10)
+PLUGBOARD_COLUMNS = slice(10, 36)
+KEY_COLUMNS = 36
+
+# Keys processed together; bounds the size of the (keys x letters) working arrays
+KERNEL_BATCH_SIZE = 2048
+
+
+def encode_key(rotors, positions, ring_settings, reflector, plugboard_connections=""):
+    """
+    Encode machine settings as one key row for the batched kernel.
+
+    :param rotors: Three rotor number strings [left, middle, right].
+    :param positions: Three start position letters (e.g., "aaa").
+    :param ring_settings: Three ring setting letters (e.g., "aaa").
+    :param reflector: A reflector string (e.g., "B").
+    :param plugboard_connections: Space-separated letter pairs (e.g., "ab cd").
+    :return: A list of KEY_COLUMNS integers.
+    """
+    row = [ROTOR_NUMBERS.index(number) for number in rotors]
+    row.append(REFLECTOR_TYPES.index(reflector))
+    row.extend(ALPHABET.index(letter) for letter in positions)
+    row.extend(ALPHABET.index(letter) for letter in ring_settings)
+    row.extend(plugboard_wiring(plugboard_connections).table)
+    if len(row) != KEY_COLUMNS:
+        raise ValueError("Expected three rotors, positions and ring settings")
+    return row
+
+
+def encode_keys(keys):
+    """
+    Encode many machine settings for the batched kernel.
+
+    :param keys: An iterable of (rotors, positions, ring_settings, reflector, plugboard_connections).
+    :return: A uint8 array of shape (keys, KEY_COLUMNS).
+    """
+    require_numpy()
+    return np.array([encode_key(*key) for key in keys], dtype=np.uint8).reshape(-1, KEY_COLUMNS)
+
+
+def state_keys(rotors, reflector, states, ring_settings="aaa", plugboard_connections=""):
+    """
+    Encode one machine key at many start positions, given as state numbers
+    (see enigma.table.state_index).
+
+    :param rotors: Three rotor number strings [left, middle, right].
+    :param reflector: A reflector string (e.g., "B").
+    :param states: A sequence of state numbers (0-17575).
+    :param ring_settings: Three ring setting letters (e.g., "aaa").
+    :param plugboard_connections: Space-separated letter pairs (e.g., "ab cd").
+    :return: A uint8 array of shape (states, KEY_COLUMNS).
+    """
+    require_numpy()
+    states = np.asarray(states, dtype=np.int64)
+    keys = np.tile(np.array(encode_key(rotors, "aaa", ring_settings, reflector, plugboard_connections),
+                            dtype=np.uint8), (len(states), 1))
+    keys[:, POSITION_COLUMNS] = np.stack([states // 676, states // 26 % 26, states % 26], axis=1)
+    return keys
+
+
+@lru_cache(maxsize=None)
+def _wiring_arrays():
+    # Forward and backward tables of every rotor at every offset, notches, and every
+    # reflector table, flattened and indexed by the numbers used in key rows:
+    # (rotor * 26 + offset) * 26 + letter and reflector * 26 + letter.
+    rotors = [rotor_wiring(number) for number in ROTOR_NUMBERS]
+    return (
+        np.array([list(table[:26]) for rotor in rotors for table in rotor.shifted_forward], dtype=np.int32).ravel(),
+        np.array([list(table[:26]) for rotor in rotors for table in rotor.shifted_backward], dtype=np.int32).ravel(),
+        np.array([rotor.notch_index for rotor in rotors], dtype=np.int32),
+        np.array([list(reflector_wiring(reflector).table) for reflector in REFLECTOR_TYPES], dtype=np.int32).ravel(),
+    )
+
+
+def _ciphertext_array(ciphertext):
+    if isinstance(ciphertext, str):
+        ciphertext = letter_indices(ciphertext)
+    return np.asarray(ciphertext, dtype=np.uint8)
+
+
+def _decrypt_batch(ciphertext, keys):
+    # Decrypt one batch on a (keys x letters) grid. Each rotor's wiring at each key's
+    # offsets is addressed by one flat base index per grid cell, reused both ways.
+    forward, backward, notches, reflectors = _wiring_arrays()
+    keys = keys.astype(np.int32)
+    count = len(keys)
+
+    presses = np.arange(1, len(ciphertext) + 1, dtype=np.int32)[None, :]
+    positions = positions_grid(*(keys[:, column, None] for column in range(4, 7)),
+                               notches[keys[:, 1, None]], notches[keys[:, 2, None]], presses)
+    bases = [(keys[:, rotor, None] * 26 + (position + 26 - keys[:, 7 + rotor, None]) % 26) * 26
+             for rotor, position in enumerate(positions)]
+
+    plugboard = keys[:, PLUGBOARD_COLUMNS].ravel()
+    row_bases = 26 * np.arange(count, dtype=np.int32)[:, None]
+    reflector_bases = keys[:, REFLECTOR_COLUMN, None] * 26
+
+    letters = plugboard.take(ciphertext + row_bases)
+    for base in reversed(bases):
+        letters = forward.take(base + letters)
+    letters = reflectors.take(reflector_bases + letters)
+    for base in bases:
+        letters = backward.take(base + letters)
+    return plugboard.take(letters + row_bases)
+
+
+def decrypt_keys(ciphertext, keys, batch_size=KERNEL_BATCH_SIZE):
+    """
+    Decrypt one ciphertext under many keys at once. Gives the same letters as
+    Enigma.process for each key. Requires NumPy.
+
+    :param ciphertext: The ciphertext, as a string (non-letters are ignored) or alphabet indices.
+    :param keys: An array of key rows, of shape (keys, KEY_COLUMNS) (see encode_keys).
+    :param batch_size: The number of keys decrypted together.
+    :return: A uint8 array of shape (keys, letters) of alphabet indices.
+    """
+    require_numpy()
+    ciphertext = _ciphertext_array(ciphertext)
+    keys = np.asarray(keys).reshape(-1, KEY_COLUMNS)
+    output = np.empty((len(keys), len(ciphertext)), dtype=np.uint8)
+    for start in range(0, len(keys), batch_size):
+        output[start:start + batch_size] = _decrypt_batch(ciphertext, keys[start:start + batch_size])
+    return output
+
+
+def score_keys(ciphertext, keys, model=None, batch_size=KERNEL_BATCH_SIZE):
+    """
+    Score the decryption of one ciphertext under many keys, without keeping the
+    decryptions. Requires NumPy.
+
+    :param ciphertext: The ciphertext, as a string (non-letters are ignored) or alphabet indices.
+    :param keys: An array of key rows, of shape (keys, KEY_COLUMNS) (see encode_keys).
+    :param model: An optional enigma.scoring.NgramModel; without one, keys are scored
+                  by the index of coincidence of their decryption.
+    :param batch_size: The number of keys decrypted together.
+    :return: A float64 array with one score per key (higher is better).
+    """
+    require_numpy()
+    ciphertext = _ciphertext_array(ciphertext)
+    keys = np.asarray(keys).reshape(-1, KEY_COLUMNS)
+    length = len(ciphertext)
+    scores = np.empty(len(keys), dtype=np.float64)
+
+    for start in range(0, len(keys), batch_size):
+        letters = _decrypt_batch(ciphertext, keys[start:start + batch_size])
+        count = len(letters)
+        if model is None:
+            # Letter counts per key in one bincount, each key in its own block of 26
+            counts = np.bincount((letters + 26 * np.arange(count)[:, None]).ravel(),
+                                 minlength=26 * count).reshape(count, 26)
+            scores[start:start + count] = (counts * (counts - 1)).sum(axis=1) / max(length * (length - 1), 1)
+        else:
+            scores[start:start + count] = model.score_array(letters)
+    return scores
@@ -1,10 +1,112 @@
+import mmap
+import os
+import re
 import string
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
+from enigma import metrics
+from enigma.engine import PADDING, MachineConfig, encrypt, fast_stack, slow_stack
 from enigma.plugboard import Plugboard
 from enigma.reflector import Reflector
 from enigma.rotor import Rotor
+from enigma.table import keystroke_table, positions_after, state_index, state_positions
 
 ALPHABET = string.ascii_lowercase
+LETTER_INDEX = {letter: index for index, letter in enumerate(ALPHABET)}
+NON_LETTERS = re.compile('[^a-z]+')
+
+# Alphabet index of each ASCII letter byte (either case), None for every other byte
+BYTE_INDEX = [LETTER_INDEX.get(chr(byte).lower()) if byte < 128 else None for byte in range(256)]
+ALPHABET_BYTES = ALPHABET.encode('ascii')
+NON_LETTER_BYTES = bytes(byte for byte in range(256) if BYTE_INDEX[byte] is None)
+
+# Texts shorter than this are not worth shipping to worker processes
+PARALLEL_CHUNK_SIZE = 1 << 16
+
+# Characters read per chunk when processing files
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Bytes processed per step when encrypting memory-mapped files
+MMAP_PAGE_SIZE = mmap.ALLOCATIONGRANULARITY * 16
+
+# A saved machine state: rotor positions (left, middle, right) and the machine key
+MachineState = namedtuple('MachineState', ['positions', 'key'])
+
+
+def _process_chunk(config, positions, text):
+    """
+    Process one chunk of a message in a worker process.
+
+    :param config: The compiled MachineConfig (see Enigma.config).
+    :param positions: The rotor positions (left, middle, right) at the start of the chunk.
+    :param text: The chunk of text.
+    :return: The processed chunk.
+    """
+    return encrypt(config, text, positions)[0]
+
+
+def _encipher_into(table, state, src, dst):
+    """
+    Encipher ASCII bytes from one byte buffer into another by walking a keystroke
+    table, as described in Enigma.process_into.
+
+    :param table: The KeystrokeTable of the machine key.
+    :param state: The rotor state number before the first byte.
+    :param src: A memoryview of bytes to read.
+    :param dst: A writable memoryview of bytes, at least as large as src.
+    :return: The rotor state number after the last letter.
+    """
+    steps = table.steps
+    permutations = table.permutations
+
+    for position, byte in enumerate(src):
+        index = BYTE_INDEX[byte]
+
+        if index is None:
+            dst[position] = byte
+            continue
+
+        state = steps[state]
+        permutation = permutations[state] or table.permutation(state)
+        dst[position] = ALPHABET_BYTES[permutation[index]]
+
+    return state
+
+
+def _process_mapped(table, state, mapped, start, stop, page_size):
+    """
+    Encipher a byte range of a memory map in place, page by page; the rotor state
+    carries across pages.
+
+    :param table: The KeystrokeTable of the machine key.
+    :param state: The rotor state number at the start of the range.
+    :param mapped: A writable mmap.
+    :param start: First byte of the range.
+    :param stop: End of the range (exclusive).
+    :param page_size: Number of bytes processed per step.
+    :return: The rotor state number at the end of the range.
+    """
+    with memoryview(mapped) as view:
+        for offset in range(start, stop, page_size):
+            with view[offset:min(offset + page_size, stop)] as page:
+                state = _encipher_into(table, state, page, page)
+    return state
+
+
+def _process_mmap_range(config, positions, path, start, stop, page_size):
+    """
+    Process a byte range of a file in place, in a worker process.
+
+    :param config: The compiled MachineConfig (see Enigma.config).
+    :param positions: The rotor positions (left, middle, right) at the start of the range.
+    :param path: Path of the file.
+    :param start: First byte of the range.
+    :param stop: End of the range (exclusive).
+    :param page_size: Number of bytes processed per step.
+    """
+    with open(path, 'r+b') as file, mmap.mmap(file.fileno(), 0) as mapped:
+        _process_mapped(keystroke_table(*config.key()), state_index(*positions), mapped, start, stop, page_size)
 
 
 class Enigma:
@@ -13,6 +115,8 @@ class Enigma:
     providing a letter substitution cipher with moving parts.
     """
 
+    __slots__ = ('rotors', 'reflector', 'plugboard', '_key')
+
     def __init__(self, rotors, initial_positions, ring_settings, reflector, plugboard_connections):
         """
         Initialize the Enigma machine.
@@ -31,35 +135,147 @@ class Enigma:
         ]
         self.reflector = Reflector(reflector)
         self.plugboard = Plugboard(plugboard_connections)
+        self._key = None
+
+
+    def key(self):
+        """
+        Return the machine key: everything except the rotor positions, in a canonical,
+        hashable form. The key is computed once and shared with clones.
+
+        :return: A tuple (rotors, ring_settings, reflector, plugboard_connections).
+        """
+        if self._key is None:
+            self._key = (
+                tuple(rotor.number for rotor in self.rotors),
+                ''.join(ALPHABET[rotor.ring] for rotor in self.rotors),
+                self.reflector.reflector_type,
+                self.plugboard.connections,
+            )
+        return self._key
+
+    def config(self):
+        """
+        Return the immutable compiled config of this machine, for use with
+        enigma.engine.encrypt. It references the shared wiring of the components.
 
+        :return: A MachineConfig.
+        """
+        left, middle, right = self.rotors
+        return MachineConfig(
+            (left.config, middle.config, right.config),
+            (left.ring, middle.ring, right.ring),
+            self.reflector.config,
+            self.plugboard.config,
+        )
+
+    def snapshot(self):
+        """
+        Save the machine state.
+
+        :return: An immutable MachineState.
+        """
+        left, middle, right = self.rotors
+        return MachineState((left.position, middle.position, right.position), self.key())
+
+    def restore(self, state):
+        """
+        Return the machine to a state saved with snapshot().
+
+        :param state: A MachineState taken from a machine with the same key.
+        """
+        if state.key is not self._key and state.key != self.key():
+            raise ValueError("State was saved from a machine with a different key")
+        for rotor, position in zip(self.rotors, state.positions):
+            rotor.position = position
+
+    def clone(self):
+        """
+        Copy the machine in constant time. The copy shares the reflector, plugboard and
+        rotor wiring with this machine but has its own rotor positions.
+
+        :return: A new Enigma in the same state.
+        """
+        machine = Enigma.__new__(Enigma)
+        machine.rotors = [rotor.copy() for rotor in self.rotors]
+        machine.reflector = self.reflector
+        machine.plugboard = self.plugboard
+        machine._key = self._key
+        return machine
+
+    def keystroke_table(self, atlas=None):
+        """
+        Return the (cached) keystroke permutation table for this machine's key.
+
+        :param atlas: An optional enigma.atlas.Atlas to read permutations from
+                      instead of computing them.
+        :return: A KeystrokeTable.
+        """
+        if atlas is not None:
+            return atlas.keystroke_table(*self.key())
+        return keystroke_table(*self.key())
 
     def step_rotors(self):
         """
-        Implement the Enigma stepping mechanism (double-stepping):
+        Implement the Enigma stepping mechanism (double-stepping), one key press at a
+        time. The rules live in enigma.stepping.positions_after:
 
-        Rules:
         - The rightmost rotor steps on every key press.
         - If the rightmost rotor hits its notch, it causes the middle rotor to step on the next press.
         - The middle rotor hitting its notch also causes the left rotor to step simultaneously
           (the double-step).
+        """
+        left, middle, right = self.rotors
+        left.position, middle.position, right.position = self.position_after(1)
+
+    def set_positions(self, positions):
+        """
+        Set the rotor positions.
+
+        :param positions: Three position letters [left, middle, right] (e.g., "aaa").
+        """
+        positions = [ALPHABET.index(position) for position in positions]
+        if len(positions) != 3:
+            raise ValueError("Expected three rotor positions")
+        for rotor, position in zip(self.rotors, positions):
+            rotor.position = position
+
+    def position_after(self, n):
+        """
+        Return the rotor positions after n more key presses, without moving the rotors.
+        Computed in constant time; the double step is taken into account.
 
-        Procedure each key press:
-          1. If the middle rotor is at notch, advance the left rotor as well (double-step).
-          2. If the middle rotor is at notch OR the right rotor is at notch, advance the middle rotor.
-          3. Always advance the right rotor.
+        :param n: Number of key presses (non-negative).
+        :return: A tuple of positions (left, middle, right), each 0-25.
         """
         left, middle, right = self.rotors
+        return positions_after(left.position, middle.position, right.position,
+                               middle.notch_index, right.notch_index, n)
 
-        middle_at_notch = (ALPHABET[middle.position] == middle.notch)
-        right_at_notch = (ALPHABET[right.position] == right.notch)
+    def seek(self, n):
+        """
+        Move the rotors forward by n key presses in constant time, as if n letters
+        had been processed.
 
-        if middle_at_notch:
-            left.rotate()
+        :param n: Number of key presses (non-negative).
+        """
+        for rotor, position in zip(self.rotors, self.position_after(n)):
+            rotor.position = position
 
-        if middle_at_notch or right_at_notch:
-            middle.rotate()
+    def encipher_index(self, index):
+        """
+        Pass one letter index through the machine at the current rotor positions.
+        The rotors are not stepped.
 
-        right.rotate()
+        :param index: The input letter as an alphabet index (0-25).
+        :return: The output letter as an alphabet index.
+        """
+        # The permutation of the current state, composed as in enigma.engine.encrypt
+        left, middle, right = self.rotors
+        plugboard = self.plugboard.config.table
+        composite = slow_stack(left.config, middle.config, self.reflector.config.table + PADDING,
+                               left.position - left.ring, middle.position - middle.ring)
+        return plugboard[fast_stack(right.config, composite, right.position - right.ring)[plugboard[index]]]
 
     def process(self, text):
         """
@@ -68,38 +284,231 @@ class Enigma:
         :param text: The input text to process (string).
         :return: The resulting encrypted or decrypted text.
         """
+        left, middle, right = self.rotors
+        output, positions, letters = encrypt(self.config(), text, (left.position, middle.position, right.position))
+        left.position, middle.position, right.position = positions
+
+        if metrics.enabled:
+            metrics.PROCESS_CALLS.inc()
+            metrics.LETTERS_PROCESSED.inc(letters)
+        return output
+
+    def process_with_table(self, text, atlas=None):
+        """
+        Encrypt or decrypt the given text using the keystroke permutation table for
+        this machine's key. Gives the same result as process(), but each letter is a
+        state transition and a table lookup once the table is warm.
+
+        :param text: The input text to process (string).
+        :param atlas: An optional enigma.atlas.Atlas to read permutations from.
+        :return: The resulting encrypted or decrypted text.
+        """
+        table = self.keystroke_table(atlas)
+        steps = table.steps
+        permutations = table.permutations
+        state = state_index(*(rotor.position for rotor in self.rotors))
+
+        text = text.lower()
+        skipped = 0
         output = []
-        for letter in text.lower():
+        for letter in text:
+            index = LETTER_INDEX.get(letter)
 
-            if letter not in ALPHABET:
-                # Non-letter characters pass unchanged
+            if index is None:
                 output.append(letter)
+                skipped += 1
                 continue
 
-            # Step rotors before each letter is processed
-            self.step_rotors()
+            state = steps[state]
+            permutation = permutations[state] or table.permutation(state)
+            output.append(ALPHABET[permutation[index]])
 
-            # Pass through plugboard
-            letter = self.plugboard.swap(letter)
+        for rotor, position in zip(self.rotors, state_positions(state)):
+            rotor.position = position
 
-            # Pass forward through the rotors (right to left)
-            for rotor in reversed(self.rotors):
-                letter = rotor.encode_forward(letter)
+        if metrics.enabled:
+            metrics.LETTERS_PROCESSED.inc(len(text) - skipped)
+        return ''.join(output)
 
-            # Reflect
-            letter = self.reflector.reflect(letter)
+    def process_into(self, src, dst):
+        """
+        Encrypt or decrypt ASCII bytes from one buffer into another without intermediate
+        copies. Letters are handled as in process(): upper-case letters are treated as
+        lower-case and every other byte passes unchanged. src and dst may be the same
+        buffer, which processes it in place.
+
+        :param src: Any buffer-protocol object (bytes, bytearray, memoryview, mmap).
+        :param dst: A writable buffer at least as large as src.
+        :return: The number of bytes written.
+        """
+        state = state_index(*(rotor.position for rotor in self.rotors))
+        # Release the views even if enciphering fails, so a memory map can still be closed
+        with memoryview(src) as source, source.cast('B') as src, \
+                memoryview(dst) as destination, destination.cast('B') as dst:
+            if dst.nbytes < src.nbytes:
+                raise ValueError("Destination buffer is smaller than the source")
+            state = _encipher_into(self.keystroke_table(), state, src, dst)
+            written = src.nbytes
+
+        for rotor, position in zip(self.rotors, state_positions(state)):
+            rotor.position = position
+        return written
+
+    def process_bytes(self, data):
+        """
+        Encrypt or decrypt ASCII bytes. See process_into().
 
-            # Pass backward through the rotors (left to right)
-            for rotor in self.rotors:
-                letter = rotor.encode_backward(letter)
+        :param data: Any buffer-protocol object (bytes, bytearray, memoryview, mmap).
+        :return: The resulting bytes.
+        """
+        output = bytearray(memoryview(data).nbytes)
+        self.process_into(data, output)
+        return bytes(output)
 
-            # Pass through plugboard again
-            letter = self.plugboard.swap(letter)
+    def process_mmap(self, path, page_size=MMAP_PAGE_SIZE, workers=1, executor=None):
+        """
+        Encrypt or decrypt a file in place through a memory map, without reading it
+        into a string. The file is walked in pages and the rotor state carries across
+        page boundaries. With several workers the file is split into byte ranges and
+        each range is processed in its own process, starting at the rotor positions
+        for its keystroke offset.
+
+        :param path: Path of the file to process.
+        :param page_size: Number of bytes processed per step.
+        :param workers: Number of worker processes.
+        :param executor: An optional ProcessPoolExecutor to run the ranges on, reused
+                         across calls; by default a pool is started per call.
+        :return: The number of bytes processed.
+        """
+        size = os.path.getsize(path)
+        if size == 0:
+            return 0
+
+        if workers == 1:
+            state = state_index(*(rotor.position for rotor in self.rotors))
+            with open(path, 'r+b') as file, mmap.mmap(file.fileno(), 0) as mapped:
+                state = _process_mapped(self.keystroke_table(), state, mapped, 0, size, page_size)
+            for rotor, position in zip(self.rotors, state_positions(state)):
+                rotor.position = position
+            return size
+
+        # Split into page-aligned ranges and count the letters in front of each one
+        range_size = -(-size // (workers * page_size)) * page_size
+        ranges = [(start, min(start + range_size, size)) for start in range(0, size, range_size)]
+        starts = []
+        presses = 0
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start, stop in ranges:
+                starts.append(self.position_after(presses))
+                for offset in range(start, stop, page_size):
+                    presses += len(mapped[offset:min(offset + page_size, stop)].translate(None, NON_LETTER_BYTES))
+
+        arguments = ([self.config()] * len(ranges), starts, [path] * len(ranges),
+                     [start for start, _ in ranges], [stop for _, stop in ranges], [page_size] * len(ranges))
+        if executor is not None:
+            list(executor.map(_process_mmap_range, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_process_mmap_range, *arguments))
+
+        self.seek(presses)
+        return size
+
+    def process_stream(self, chunks):
+        """
+        Encrypt or decrypt an iterable of text chunks lazily. The rotor state carries
+        over from one chunk to the next, so the output chunks joined together equal
+        process() applied to the joined input.
 
-            output.append(letter)
+        :param chunks: An iterable of strings.
+        :return: A generator of processed strings, one per input chunk.
+        """
+        for chunk in chunks:
+            yield self.process(chunk)
 
+    def process_file(self, src, dst, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Encrypt or decrypt a text file into another in fixed-size chunks, using
+        constant memory whatever the file size.
+
+        :param src: A text file object to read from.
+        :param dst: A text file object to write to.
+        :param chunk_size: Number of characters read at a time.
+        """
+        for chunk in self.process_stream(iter(lambda: src.read(chunk_size), '')):
+            dst.write(chunk)
+
+    def process_parallel(self, text, workers=None, chunk_size=PARALLEL_CHUNK_SIZE, executor=None):
+        """
+        Encrypt or decrypt the given text across several processes. The text is split
+        into chunks and each worker starts at the rotor positions for its chunk's
+        keystroke offset, computed directly with position_after(), and enciphers it
+        with enigma.engine.encrypt. Gives the same result as process().
+
+        :param text: The input text to process (string).
+        :param workers: Number of worker processes (defaults to the CPU count).
+        :param chunk_size: Approximate number of characters per chunk.
+        :param executor: An optional ProcessPoolExecutor to run the chunks on, so that one
+                         pool serves many messages; by default a pool is started per call.
+        :return: The resulting encrypted or decrypted text.
+        """
+        text = text.lower()
+        workers = workers or os.cpu_count() or 1
+        chunk_size = max(chunk_size, -(-len(text) // (workers * 4)))
+        if workers == 1 or len(text) <= chunk_size:
+            return self.process(text)
+
+        chunks = [text[start:start + chunk_size] for start in range(0, len(text), chunk_size)]
+
+        # Each chunk starts after the letters of all chunks before it
+        starts = []
+        presses = 0
+        for chunk in chunks:
+            starts.append(self.position_after(presses))
+            presses += len(NON_LETTERS.sub('', chunk))
+
+        arguments = ([self.config()] * len(chunks), starts, chunks)
+        if executor is not None:
+            output = list(executor.map(_process_chunk, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                output = list(executor.map(_process_chunk, *arguments))
+
+        self.seek(presses)
         return ''.join(output)
 
+    def process_array(self, indices):
+        """
+        Encrypt or decrypt an array of letter indices with NumPy. The permutations
+        of the rotor positions the array reaches are composed once, and each letter is
+        then a single table lookup. Requires NumPy.
+
+        :param indices: A NumPy uint8 array of alphabet indices (0-25).
+        :return: A NumPy uint8 array of output alphabet indices.
+        """
+        # Imported here so that NumPy stays out of the import (and cold start) of the machine
+        from enigma.vectorized import encipher_array
+
+        output, positions = encipher_array(self.rotors, self.reflector, self.plugboard, indices)
+        for rotor, position in zip(self.rotors, positions):
+            rotor.position = position
+        return output
+
+    def process_numpy(self, text):
+        """
+        Encrypt or decrypt the given text with NumPy. Gives the same result as process(),
+        but is much faster on long texts. Requires NumPy.
+
+        :param text: The input text to process (string).
+        :return: The resulting encrypted or decrypted text.
+        """
+        from enigma.vectorized import encipher_text
+
+        output, positions = encipher_text(self.rotors, self.reflector, self.plugboard, text)
+        for rotor, position in zip(self.rotors, positions):
+            rotor.position = position
+        return output
+
 
 
 
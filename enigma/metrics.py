@@ -0,0 +1,226 @@
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from 100 microseconds up
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Whether Enigma.process and process_with_table record their counters. It is read
+# once per call, so the counters cost nothing while it is off.
+enabled = False
+
+
+def enable(flag=True):
+    """
+    Turn the counters inside Enigma.process and process_with_table on or off.
+
+    :param flag: True to record them.
+    """
+    global enabled
+    enabled = flag
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by label values.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        Initialize the counter.
+
+        :param name: The metric name (e.g., "enigma_requests_total").
+        :param documentation: The help text.
+        :param labels: The label names (e.g., ("method", "path")).
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        """
+        Increase the count.
+
+        :param amount: The non-negative amount to add.
+        :param labels: The label values, in the order of the label names.
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        """
+        Return the current count for some label values.
+        """
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labels:
+            values = [((), 0)]
+        for labels, value in values:
+            yield self.name, _format_labels(self.labels, labels), value
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets, with their count and sum,
+    optionally split by label values.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        :param name: The metric name (e.g., "enigma_request_seconds").
+        :param documentation: The help text.
+        :param labels: The label names (e.g., ("phase",)).
+        :param buckets: The upper bounds of the buckets, in increasing order.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label values: [per-bucket counts (the last for +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        """
+        Record an observation.
+
+        :param value: The observed value (e.g., seconds).
+        :param labels: The label values, in the order of the label names.
+        """
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bucket] += 1
+            entry[1] += value
+
+    def time(self, labels=()):
+        """
+        Time a block of code:
+
+            with histogram.time(("render",)):
+                ...
+
+        :param labels: The label values, in the order of the label names.
+        :return: A context manager that observes the elapsed seconds.
+        """
+        return _Timer(self, labels)
+
+    def count(self, labels=()):
+        """
+        Return the number of observations for some label values.
+        """
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield self.name + '_bucket', _format_labels(self.labels, labels, [('le', _format_value(bound))]), cumulative
+            yield self.name + '_sum', _format_labels(self.labels, labels), total
+            yield self.name + '_count', _format_labels(self.labels, labels), cumulative
+
+
+class _Timer:
+
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+
+class Registry:
+    """
+    A set of metrics rendered together in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, documentation, labels=()):
+        """
+        Create and register a Counter (arguments as for Counter).
+        """
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Create and register a Histogram (arguments as for Histogram).
+        """
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def register(self, metric):
+        """
+        Add a metric.
+
+        :param metric: A Counter or Histogram.
+        :return: The metric.
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        Render every metric.
+
+        :return: The exposition text (string).
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PROCESS_CALLS = REGISTRY.counter("enigma_process_calls_total", "Calls to Enigma.process.")
+LETTERS_PROCESSED = REGISTRY.counter("enigma_letters_processed_total",
+                                     "Letters enciphered by Enigma.process and Enigma.process_with_table.")
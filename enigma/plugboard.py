@@ -1,6 +1,47 @@
 import string
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
 
 ALPHABET = string.ascii_lowercase
+PLUGBOARD_CACHE_SIZE = 1024
+
+# Immutable wiring of a set of plugboard connections, shared by every Plugboard using them
+PlugboardWiring = namedtuple('PlugboardWiring', ['connections', 'mapping', 'table'])
+
+
+@lru_cache(maxsize=PLUGBOARD_CACHE_SIZE)
+def plugboard_wiring(connections):
+    """
+    Parse and validate plugboard connections, reusing the result for repeated input.
+
+    :param connections: Space-separated letter pairs (e.g., "ab cd ef"), or None.
+    :return: A PlugboardWiring.
+    """
+    if connections:
+        connections = connections.lower().split(" ")
+    else:
+        connections = []
+
+    mapping = dict(zip(ALPHABET, ALPHABET))
+
+    # Check for duplicate letters in the connections
+    all_plug_letters = ''.join(connections)
+    if len(set(all_plug_letters)) != len(all_plug_letters):
+        raise ValueError("Duplicate letters detected in plugboard connections")
+
+    # Set up swaps
+    for pair in connections:
+        a, b = pair
+        mapping[a] = b
+        mapping[b] = a
+
+    return PlugboardWiring(
+        # Canonical form of the connections, e.g. "ba dc" -> "ab cd"
+        ' '.join(sorted(''.join(sorted(pair)) for pair in connections)),
+        MappingProxyType(mapping),
+        bytes(ALPHABET.index(mapping[letter]) for letter in ALPHABET),
+    )
 
 
 class Plugboard:
@@ -8,29 +49,30 @@ class Plugboard:
     The plugboard swaps pairs of letters before and after passing through the rotors.
     """
 
+    __slots__ = ('config',)
+
     def __init__(self, connections):
         """
         Initialize the plugboard with given connections (pairs of letters).
 
         :param connections: A list of two-letter strings (e.g., ['ab', 'cd', 'ef'])
         """
-        if connections:
-            connections = connections.lower().split(" ")
-        else:
-            connections = []
+        self.config = plugboard_wiring(connections)
 
-        self.mapping = dict(zip(ALPHABET, ALPHABET))
+    @property
+    def connections(self):
+        """The connections in canonical form (e.g., "ab cd")."""
+        return self.config.connections
 
-        # Check for duplicate letters in the connections
-        all_plug_letters = ''.join(connections)
-        if len(set(all_plug_letters)) != len(all_plug_letters):
-            raise ValueError("Duplicate letters detected in plugboard connections")
+    @property
+    def mapping(self):
+        """The read-only letter mapping."""
+        return self.config.mapping
 
-        # Set up swaps
-        for pair in connections:
-            a, b = pair
-            self.mapping[a] = b
-            self.mapping[b] = a
+    @property
+    def table(self):
+        """The swap table (bytes of alphabet indices)."""
+        return self.config.table
 
     def swap(self, letter):
         """
@@ -39,4 +81,116 @@ class Plugboard:
         :param letter: The letter to potentially swap.
         :return: The swapped or original letter.
         """
-        return self.mapping[letter]
\ No newline at end of file
+        return self.config.mapping[letter]
+
+    def swap_index(self, index):
+        """
+        Swap a letter index if it is plugged on the plugboard.
+
+        :param index: The alphabet index (0-25) to potentially swap.
+        :return: The swapped or original alphabet index.
+        """
+        return self.config.table[index]
+
+
+class PlugboardHypothesis:
+    """
+    A mutable plugboard for key search: pairs are connected, disconnected and
+    re-paired in constant time on a swap table, instead of parsing a new set of
+    connections for every trial.
+    """
+
+    __slots__ = ('table', 'pairs')
+
+    def __init__(self, connections=None):
+        """
+        Initialize the hypothesis.
+
+        :param connections: Optional space-separated letter pairs to start from (e.g., "ab cd").
+        """
+        self.table = bytearray(plugboard_wiring(connections).table)
+        self.pairs = len(self.connections.split()) if connections else 0
+
+    @property
+    def connections(self):
+        """The connections in canonical form (e.g., "ab cd")."""
+        return ' '.join(ALPHABET[a] + ALPHABET[b] for a, b in enumerate(self.table) if a < b)
+
+    def copy(self):
+        """
+        Return an independent copy of the hypothesis.
+        """
+        other = PlugboardHypothesis.__new__(PlugboardHypothesis)
+        other.table = bytearray(self.table)
+        other.pairs = self.pairs
+        return other
+
+    def plugboard(self):
+        """
+        Return an immutable Plugboard with the current connections.
+        """
+        return Plugboard(self.connections)
+
+    def connect(self, first, second):
+        """
+        Connect two unplugged letters.
+
+        :param first: An alphabet index (0-25).
+        :param second: Another alphabet index (0-25).
+        :return: The letter indices whose partner changed.
+        """
+        table = self.table
+        if first == second or table[first] != first or table[second] != second:
+            raise ValueError("Both letters must be different and unplugged")
+        table[first] = second
+        table[second] = first
+        self.pairs += 1
+        return first, second
+
+    def disconnect(self, letter):
+        """
+        Remove the pair a letter belongs to.
+
+        :param letter: An alphabet index (0-25).
+        :return: The letter indices whose partner changed.
+        """
+        table = self.table
+        partner = table[letter]
+        if partner == letter:
+            raise ValueError("The letter is not plugged")
+        table[letter] = letter
+        table[partner] = partner
+        self.pairs -= 1
+        return letter, partner
+
+    def swap(self, first, second):
+        """
+        Connect two letters to each other, plugged or not. Their former partners are
+        connected together if both had one, and left unplugged otherwise.
+
+        :param first: An alphabet index (0-25).
+        :param second: Another alphabet index (0-25).
+        :return: The letter indices whose partner changed.
+        """
+        table = self.table
+        first_partner = table[first]
+        second_partner = table[second]
+        if first == second or first_partner == second:
+            raise ValueError("The letters must be different and not already connected")
+
+        changed = [first, second]
+        pairs = self.pairs + 1
+        for letter, partner in ((first, first_partner), (second, second_partner)):
+            if partner != letter:
+                table[partner] = partner
+                changed.append(partner)
+                pairs -= 1
+        if len(changed) == 4:
+            table[first_partner] = second_partner
+            table[second_partner] = first_partner
+            pairs += 1
+
+        table[first] = second
+        table[second] = first
+        self.pairs = pairs
+        return tuple(changed)
@@ -1,13 +1,37 @@
 import string
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
 
 ALPHABET = string.ascii_lowercase
 
+# Immutable wiring of one reflector type, shared by every Reflector of that type
+ReflectorWiring = namedtuple('ReflectorWiring', ['reflector_type', 'mapping', 'table'])
+
+
+@lru_cache(maxsize=None)
+def reflector_wiring(reflector_type):
+    """
+    Return the shared wiring for a reflector type.
+
+    :param reflector_type: A string in [A, B, C] indicating the reflector type.
+    :return: A ReflectorWiring.
+    """
+    mapping = dict(zip(ALPHABET, Reflector.REFLECTOR_CONFIGS[reflector_type]))
+    return ReflectorWiring(
+        reflector_type,
+        MappingProxyType(mapping),
+        bytes(ALPHABET.index(mapping[letter]) for letter in ALPHABET),
+    )
+
 
 class Reflector:
     """
     A reflector maps each letter to another letter, providing symmetry.
     """
 
+    __slots__ = ('config',)
+
     REFLECTOR_CONFIGS = {
         "A": "ejmzalyxvbwfcrquontspikhgd",
         "B": "yruhqsldpxngokmiebfzcwvjat",
@@ -20,7 +44,22 @@ class Reflector:
 
         :param reflector_type: A string in [A, B, C] indicating the reflector type.
         """
-        self.mapping = dict(zip(ALPHABET, self.REFLECTOR_CONFIGS[reflector_type]))
+        self.config = reflector_wiring(reflector_type)
+
+    @property
+    def reflector_type(self):
+        """The reflector type (e.g., "B")."""
+        return self.config.reflector_type
+
+    @property
+    def mapping(self):
+        """The read-only letter mapping."""
+        return self.config.mapping
+
+    @property
+    def table(self):
+        """The wiring table (bytes of alphabet indices)."""
+        return self.config.table
 
     def reflect(self, letter):
         """
@@ -29,4 +68,13 @@ class Reflector:
         :param letter: The letter to reflect.
         :return: The reflected letter.
         """
-        return self.mapping[letter]
\ No newline at end of file
+        return self.config.mapping[letter]
+
+    def reflect_index(self, index):
+        """
+        Reflect a letter index according to the reflector's wiring.
+
+        :param index: The alphabet index (0-25) to reflect.
+        :return: The reflected alphabet index.
+        """
+        return self.config.table[index]
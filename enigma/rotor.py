@@ -1,7 +1,49 @@
 import string
+from collections import namedtuple
+from functools import lru_cache
+from itertools import permutations
 
 ALPHABET = string.ascii_lowercase
 
+# Immutable wiring of one rotor type, shared by every Rotor of that type.
+# forward[i] is the contact wired to contact i and backward is its inverse.
+# shifted_forward[offset] and shifted_backward[offset] are the same mappings with the
+# rotor offset (position minus ring) already applied, as 256-byte bytes.translate tables.
+RotorWiring = namedtuple('RotorWiring', ['number', 'wiring', 'notch', 'forward', 'backward', 'notch_index',
+                                         'shifted_forward', 'shifted_backward'])
+
+
+def _shifted_tables(table):
+    # One translation table per offset; bytes beyond the alphabet map to themselves
+    return tuple(
+        bytes((table[(index + offset) % 26] - offset) % 26 for index in range(26)) + bytes(range(26, 256))
+        for offset in range(26)
+    )
+
+
+@lru_cache(maxsize=None)
+def rotor_wiring(number):
+    """
+    Return the shared wiring for a rotor type.
+
+    :param number: A string in [I, II, III, IV, V] indicating the rotor number.
+    :return: A RotorWiring.
+    """
+    wiring = Rotor.ROTOR_CONFIGS[number]["wiring"]
+    notch = Rotor.ROTOR_CONFIGS[number]["notch"]
+    forward = bytes(ALPHABET.index(letter) for letter in wiring)
+    backward = bytes(wiring.index(letter) for letter in ALPHABET)
+    return RotorWiring(
+        number,
+        wiring,
+        notch,
+        forward,
+        backward,
+        ALPHABET.index(notch),
+        _shifted_tables(forward),
+        _shifted_tables(backward),
+    )
+
 
 class Rotor:
     """
@@ -9,8 +51,13 @@ class Rotor:
     - Has a specific wiring configuration mapping A-Z to a permuted A-Z.
     - Has a notch indicating where it will cause the next rotor to step.
     - Has a ring setting and a position that affect how letters are encoded.
+
+    The wiring is shared between rotors of the same type; a rotor only holds a
+    reference to it plus its position and ring setting.
     """
 
+    __slots__ = ('config', 'position', 'ring')
+
     ROTOR_CONFIGS = {
         "I": {"wiring": "ekmflgdqvzntowyhxuspaibrcj", "notch": "q"},
         "II": {"wiring": "ajdksiruxblhwtmcqgznpyfvoe", "notch": "e"},
@@ -27,11 +74,52 @@ class Rotor:
         :param position: The initial position (letter) of the rotor.
         :param ring: The ring setting (letter) of the rotor.
         """
-        self.wiring = self.ROTOR_CONFIGS[number]["wiring"]
-        self.notch = self.ROTOR_CONFIGS[number]["notch"]
+        self.config = rotor_wiring(number)
         self.position = ALPHABET.index(position)
         self.ring = ALPHABET.index(ring)
 
+    @property
+    def number(self):
+        """The rotor number (e.g., "I")."""
+        return self.config.number
+
+    @property
+    def wiring(self):
+        """The wiring as a string of letters."""
+        return self.config.wiring
+
+    @property
+    def notch(self):
+        """The notch letter."""
+        return self.config.notch
+
+    @property
+    def forward(self):
+        """The forward wiring table (bytes of alphabet indices)."""
+        return self.config.forward
+
+    @property
+    def backward(self):
+        """The backward (inverse) wiring table."""
+        return self.config.backward
+
+    @property
+    def notch_index(self):
+        """The notch position (0-25)."""
+        return self.config.notch_index
+
+    def copy(self):
+        """
+        Copy the rotor. The copy shares the wiring but has its own position.
+
+        :return: A new Rotor in the same state.
+        """
+        rotor = Rotor.__new__(Rotor)
+        rotor.config = self.config
+        rotor.position = self.position
+        rotor.ring = self.ring
+        return rotor
+
     def rotate(self):
         """
         Rotate the rotor by one step and return True if this rotor is now at its notch.
@@ -39,29 +127,34 @@ class Rotor:
         """
         self.position = (self.position + 1) % 26
 
-    def encode_forward(self, letter):
+    def encode_forward_index(self, index):
         """
-        Encode a letter passing forward (right-to-left through the rotor stack).
+        Encode a letter index passing forward (right-to-left through the rotor stack).
 
-        :param letter: The input letter to be encoded.
-        :return: The encoded letter.
+        :param index: The input letter as an alphabet index (0-25).
+        :return: The encoded alphabet index.
         """
-        # Calculate the offset from the ring setting and current position
         offset = self.position - self.ring
+        return (self.config.forward[(index + offset) % 26] - offset) % 26
 
-        # Find the letter's index in the alphabet, then adjust by the offset
-        input_index = ALPHABET.index(letter)
-        adjusted_input_index = (input_index + offset) % 26
+    def encode_backward_index(self, index):
+        """
+        Encode a letter index passing backward (left-to-right through the rotor stack).
 
-        # Use adjusted index to pick a letter from the wiring
-        encoded_letter = self.wiring[adjusted_input_index]
+        :param index: The input letter as an alphabet index (0-25).
+        :return: The encoded alphabet index.
+        """
+        offset = self.position - self.ring
+        return (self.config.backward[(index + offset) % 26] - offset) % 26
 
-        # Find encoded letter's index and reverse the offset
-        encoded_index = ALPHABET.index(encoded_letter)
-        final_index = (encoded_index - offset) % 26
+    def encode_forward(self, letter):
+        """
+        Encode a letter passing forward (right-to-left through the rotor stack).
 
-        # Return the encoded letter after reversing the offset
-        return ALPHABET[final_index]
+        :param letter: The input letter to be encoded.
+        :return: The encoded letter.
+        """
+        return ALPHABET[self.encode_forward_index(ALPHABET.index(letter))]
 
     def encode_backward(self, letter):
         """
@@ -70,19 +163,13 @@ class Rotor:
         :param letter: The input letter to be encoded backward.
         :return: The encoded letter.
         """
-        # Calculate the offset from the ring setting and current position
-        offset = self.position - self.ring
+        return ALPHABET[self.encode_backward_index(ALPHABET.index(letter))]
 
-        # Adjust the input letter's index by the offset
-        input_index = ALPHABET.index(letter)
-        adjusted_input_index = (input_index + offset) % 26
-        adjusted_letter = ALPHABET[adjusted_input_index]
 
-        # Determine which wiring index produces this adjusted letter
-        wiring_index = self.wiring.index(adjusted_letter)
-
-        # Reverse the offset and return the corresponding alphabet letter
-        final_index = (wiring_index - offset) % 26
+def all_rotor_orders():
+    """
+    Return every ordered choice of three distinct rotors.
 
-        # Return the encoded letter after reversing the offset
-        return ALPHABET[final_index]
\ No newline at end of file
+    :return: A list of (left, middle, right) rotor number tuples (60 for rotors I-V).
+    """
+    return list(permutations(Rotor.ROTOR_CONFIGS, 3))
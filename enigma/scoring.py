@@ -0,0 +1,398 @@
+import argparse
+import math
+import mmap
+import os
+import string
+import struct
+import sys
+from array import array
+
+from enigma.vectorized import np, require_numpy
+
+ALPHABET = string.ascii_lowercase
+LETTER_INDEX = {letter: index for index, letter in enumerate(ALPHABET)}
+
+MAGIC = b"ENIGNGRM"
+VERSION = 1
+
+# magic, version, n-gram length, data offset; the table follows as little-endian float32
+HEADER = struct.Struct("<8sHHI")
+DATA_ALIGNMENT = 64
+
+
+def letter_indices(text):
+    """
+    Convert the letters of a text to alphabet indices, dropping everything else.
+
+    :param text: The text (string).
+    :return: A list of alphabet indices (0-25).
+    """
+    return [LETTER_INDEX[letter] for letter in text.lower() if letter in LETTER_INDEX]
+
+
+def _log_table(counts):
+    # Log10 probabilities of n-gram counts; unseen n-grams get a floor below the rarest seen one
+    total = max(sum(counts), 1)
+    floor = math.log10(0.01 / total)
+    return array('f', (math.log10(count / total) if count else floor for count in counts))
+
+
+class NgramModel:
+    """
+    Log-probabilities of letter n-grams, stored densely: the n-gram with letter
+    indices (i1, ..., in) is at position i1 * 26^(n-1) + ... + in.
+    """
+
+    def __init__(self, n, table, path=None):
+        """
+        Initialize the model.
+
+        :param n: The n-gram length.
+        :param table: A sequence of 26**n log10 probabilities.
+        :param path: The file the table is mapped from, if any (see load).
+        """
+        if len(table) != 26 ** n:
+            raise ValueError(f"Expected {26 ** n} entries for {n}-grams, got {len(table)}")
+        self.n = n
+        self.table = table
+        self.path = path
+        self.mapped = None
+
+    @classmethod
+    def from_text(cls, corpus, n=3):
+        """
+        Estimate a model from a text corpus.
+
+        :param corpus: The corpus text; non-letters are ignored.
+        :param n: The n-gram length.
+        :return: An NgramModel.
+        """
+        size = 26 ** n
+        counts = array('L', [0]) * size
+        code = 0
+        for position, index in enumerate(letter_indices(corpus)):
+            code = (code * 26 + index) % size
+            if position >= n - 1:
+                counts[code] += 1
+        return cls(n, _log_table(counts))
+
+    @classmethod
+    def from_counts(cls, lines):
+        """
+        Compile a model from n-gram frequency lines such as "TION 13168375".
+        The n-gram length is taken from the first line.
+
+        :param lines: An iterable of "NGRAM COUNT" lines; blank lines are skipped.
+        :return: An NgramModel.
+        """
+        n = None
+        counts = None
+        for line in lines:
+            if not line.strip():
+                continue
+            ngram, count = line.split()
+            ngram = ngram.lower()
+            if n is None:
+                n = len(ngram)
+                counts = array('Q', [0]) * 26 ** n
+            if len(ngram) != n or any(letter not in LETTER_INDEX for letter in ngram):
+                raise ValueError(f"Invalid {n}-gram: {ngram!r}")
+            code = 0
+            for letter in ngram:
+                code = code * 26 + LETTER_INDEX[letter]
+            counts[code] += int(count)
+        if n is None:
+            raise ValueError("No n-gram counts given")
+        return cls(n, _log_table(counts))
+
+    def save(self, path):
+        """
+        Write the model to a binary file that load can memory-map.
+
+        :param path: Path of the file to write.
+        """
+        data_offset = -(-HEADER.size // DATA_ALIGNMENT) * DATA_ALIGNMENT
+        header = bytearray(data_offset)
+        HEADER.pack_into(header, 0, MAGIC, VERSION, self.n, data_offset)
+        table = array('f', self.table)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        with open(path, 'wb') as file:
+            file.write(header)
+            file.write(table.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a model written by save. Nothing is parsed or copied, so processes
+        that load the same file share its pages.
+
+        :param path: Path of the model file.
+        :return: An NgramModel.
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError("Not an n-gram model file (too short)")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        table = None
+        try:
+            magic, version, n, data_offset = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not an n-gram model file (or an unsupported version)")
+            if len(mapped) < data_offset + 4 * 26 ** n:
+                raise ValueError(f"Truncated n-gram model file: expected {data_offset + 4 * 26 ** n} bytes, "
+                                 f"got {len(mapped)}")
+
+            table = memoryview(mapped)[data_offset:data_offset + 4 * 26 ** n].cast('f')
+            if sys.byteorder != 'little':
+                # Big-endian platforms get a converted copy
+                table = array('f', table.tobytes())
+                table.byteswap()
+            model = cls(n, table, path)
+        except BaseException:
+            # Views of the map must be released before it can be closed
+            if isinstance(table, memoryview):
+                table.release()
+            mapped.close()
+            raise
+        model.mapped = mapped
+        return model
+
+    def close(self):
+        """
+        Release the memory map of a loaded model.
+        """
+        if self.mapped is not None:
+            if isinstance(self.table, memoryview):
+                self.table.release()
+            self.mapped.close()
+            self.mapped = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __reduce__(self):
+        # A loaded model travels to worker processes as its path and is mapped again there
+        if self.path is not None:
+            return NgramModel.load, (self.path,)
+        return NgramModel, (self.n, self.table)
+
+    def score(self, indices):
+        """
+        Score a sequence of letter indices: the sum of the log-probabilities of its n-grams.
+
+        :param indices: A sequence of alphabet indices (0-25).
+        :return: The score (higher is more language-like).
+        """
+        n = self.n
+        table = self.table
+        size = 26 ** n
+        code = 0
+        total = 0.0
+        for position, index in enumerate(indices):
+            code = (code * 26 + index) % size
+            if position >= n - 1:
+                total += table[code]
+        return total
+
+    def score_text(self, text):
+        """
+        Score the letters of a text.
+
+        :param text: The text (string).
+        :return: The score (higher is more language-like).
+        """
+        return self.score(letter_indices(text))
+
+    def delta(self, indices, changes):
+        """
+        Compute how the score changes when a few letters are replaced, for instance by
+        a plugboard swap, rescoring only the n-grams that overlap them.
+
+        :param indices: A sequence of alphabet indices (0-25), left unchanged.
+        :param changes: A dict mapping positions to their new alphabet indices.
+        :return: The new score minus the old score.
+        """
+        n = self.n
+        table = self.table
+        size = 26 ** n
+        last_start = len(indices) - n
+        positions = sorted(changes)
+        difference = 0.0
+        current = 0
+        while current < len(positions):
+            # Changes less than n letters apart share n-grams: roll through them together
+            first = max(positions[current] - n + 1, 0)
+            last = positions[current]
+            current += 1
+            while current < len(positions) and positions[current] - n < last:
+                last = positions[current]
+                current += 1
+
+            old = new = 0
+            for position in range(first, min(last, last_start) + n):
+                index = indices[position]
+                old = (old * 26 + index) % size
+                new = (new * 26 + changes.get(position, index)) % size
+                if position - first >= n - 1:
+                    difference += table[new] - table[old]
+        return difference
+
+    def table_array(self):
+        """
+        Return the table as a NumPy array, without copying it when it is a float32
+        buffer (as built or loaded here). Requires NumPy.
+
+        :return: A float32 array of 26**n log10 probabilities.
+        """
+        require_numpy()
+        return np.asarray(self.table, dtype=np.float32)
+
+    def ngram_scores(self, indices):
+        """
+        Look up the log-probability of every n-gram at once. Requires NumPy.
+
+        :param indices: An integer array of alphabet indices; a 2-D array holds one text per row.
+        :return: A float32 array with one entry per n-gram along the last axis.
+        """
+        require_numpy()
+        indices = np.asarray(indices, dtype=np.int64)
+        count = max(indices.shape[-1] - self.n + 1, 0)
+        codes = np.zeros(indices.shape[:-1] + (count,), dtype=np.int64)
+        for offset in range(self.n):
+            codes = codes * 26 + indices[..., offset:offset + count]
+        return self.table_array()[codes]
+
+    def score_array(self, indices):
+        """
+        Vectorized form of score. Requires NumPy.
+
+        :param indices: An integer array of alphabet indices; a 2-D array holds one text per row.
+        :return: The score, or an array with one score per row.
+        """
+        return self.ngram_scores(indices).sum(axis=-1, dtype=np.float64)
+
+    def window_scores(self, indices, width):
+        """
+        Score every run of `width` consecutive letters, for instance to find the
+        stretch of a decryption that reads best. Requires NumPy.
+
+        :param indices: A 1-D integer array of alphabet indices.
+        :param width: The window length in letters (at least n).
+        :return: A float64 array where entry i scores the letters [i, i + width).
+        """
+        require_numpy()
+        if width < self.n:
+            raise ValueError(f"Windows must be at least {self.n} letters wide")
+        span = width - self.n + 1
+        cumulative = np.concatenate(([0.0], np.cumsum(self.ngram_scores(indices), dtype=np.float64)))
+        if len(cumulative) <= span:
+            return np.zeros(0)
+        return cumulative[span:] - cumulative[:-span]
+
+
+class RunningScore:
+    """
+    The score of a text under an NgramModel, kept up to date as letters change. The
+    code of every n-gram is kept, so a change only costs a lookup per n-gram it touches.
+    """
+
+    def __init__(self, model, indices):
+        """
+        Score a text.
+
+        :param model: An NgramModel.
+        :param indices: A sequence of alphabet indices (0-25); it is copied.
+        """
+        n = model.n
+        self.model = model
+        self.indices = list(indices)
+        # Weight of the letter at each offset within an n-gram
+        self.weights = [26 ** (n - 1 - offset) for offset in range(n)]
+        self.codes = []
+        code = 0
+        for position, index in enumerate(self.indices):
+            code = (code * 26 + index) % (26 ** n)
+            if position >= n - 1:
+                self.codes.append(code)
+        table = model.table
+        self.score = sum(table[code] for code in self.codes)
+        # Scratch space for the code shifts of a change, kept zeroed between calls
+        self.shifts = [0] * len(self.codes)
+
+    def _shift(self, changes):
+        # Accumulate how much each touched n-gram code moves into the shift buffer and
+        # return the touched starts. Shifts are sums of distinct powers of 26 with
+        # factors below 26, so a touched n-gram never has a zero shift.
+        indices = self.indices
+        shifts = self.shifts
+        last = len(shifts) - 1
+        touched = []
+        for position, letter in changes.items():
+            difference = letter - indices[position]
+            start = position
+            for weight in self.weights:
+                if 0 <= start <= last:
+                    if not shifts[start]:
+                        touched.append(start)
+                    shifts[start] += difference * weight
+                start -= 1
+        return touched
+
+    def delta(self, changes):
+        """
+        Compute how the score would change if some letters were replaced.
+
+        :param changes: A dict mapping positions to their new alphabet indices.
+        :return: The new score minus the current score.
+        """
+        table = self.model.table
+        codes = self.codes
+        shifts = self.shifts
+        difference = 0.0
+        for start in self._shift(changes):
+            code = codes[start]
+            difference += table[code + shifts[start]] - table[code]
+            shifts[start] = 0
+        return difference
+
+    def apply(self, changes):
+        """
+        Replace some letters and update the score.
+
+        :param changes: A dict mapping positions to their new alphabet indices.
+        """
+        table = self.model.table
+        codes = self.codes
+        shifts = self.shifts
+        for start in self._shift(changes):
+            code = codes[start]
+            self.score += table[code + shifts[start]] - table[code]
+            codes[start] = code + shifts[start]
+            shifts[start] = 0
+        for position, letter in changes.items():
+            self.indices[position] = letter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile an n-gram model into a binary scoring table.")
+    parser.add_argument("corpus", help="a text corpus, or n-gram count lines with --counts")
+    parser.add_argument("path", help="output file")
+    parser.add_argument("-n", type=int, default=4, help="n-gram length for a text corpus (default: 4)")
+    parser.add_argument("--counts", action="store_true", help="the corpus holds \"NGRAM COUNT\" lines")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as file:
+        if args.counts:
+            model = NgramModel.from_counts(file)
+        else:
+            model = NgramModel.from_text(file.read(), args.n)
+    model.save(args.path)
+
+
+if __name__ == '__main__':
+    main()
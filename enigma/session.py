@@ -0,0 +1,192 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from enigma.machine import MachineState
+
+# Seconds a session stays valid after it is saved
+DEFAULT_TTL = 3600
+
+
+def new_token():
+    """
+    Return a new opaque session token.
+
+    :return: A URL-safe random string.
+    """
+    return secrets.token_urlsafe(16)
+
+
+def _encode_key(key):
+    rotors, ring_settings, reflector, plugboard_connections = key
+    return json.dumps([list(rotors), ring_settings, reflector, plugboard_connections])
+
+
+def _decode_key(text):
+    rotors, ring_settings, reflector, plugboard_connections = json.loads(text)
+    return tuple(rotors), ring_settings, reflector, plugboard_connections
+
+
+class MemorySessionStore:
+    """
+    Machine states by session token, held in memory: a bounded, thread-safe LRU
+    whose entries expire a fixed time after they are saved.
+
+    Every save issues a new token, so a token always refers to the same state and a
+    retried request continues from the same place.
+    """
+
+    def __init__(self, maxsize=1024, ttl=DEFAULT_TTL, clock=time.monotonic):
+        """
+        Initialize the store.
+
+        :param maxsize: Maximum number of sessions kept.
+        :param ttl: Seconds a session stays valid.
+        :param clock: A function returning the current time in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        # token -> (expiry time, MachineState)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, state):
+        """
+        Store a machine state.
+
+        :param state: A MachineState (see Enigma.snapshot).
+        :return: The session token.
+        """
+        token = new_token()
+        with self._lock:
+            self._sessions[token] = (self.clock() + self.ttl, state)
+            if len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+        return token
+
+    def load(self, token):
+        """
+        Look up the machine state of a session.
+
+        :param token: A session token returned by save.
+        :return: The MachineState, or None if the token is unknown or expired.
+        """
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires <= self.clock():
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return state
+
+    def delete(self, token):
+        """
+        Forget a session.
+
+        :param token: A session token.
+        """
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Machine states by session token, kept in a SQLite database so that they survive
+    restarts and are shared by the processes using the same file.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, clock=time.time):
+        """
+        Open (and create if needed) the session database.
+
+        :param path: Path of the database file (":memory:" for a private one).
+        :param ttl: Seconds a session stays valid.
+        :param clock: A function returning the current (wall clock) time in seconds.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "token TEXT PRIMARY KEY, positions TEXT NOT NULL, key TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def save(self, state):
+        """
+        Store a machine state, and drop expired sessions.
+
+        :param state: A MachineState (see Enigma.snapshot).
+        :return: The session token.
+        """
+        token = new_token()
+        now = self.clock()
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+            self._connection.execute(
+                "INSERT INTO sessions (token, positions, key, expires) VALUES (?, ?, ?, ?)",
+                (token, json.dumps(list(state.positions)), _encode_key(state.key), now + self.ttl),
+            )
+        return token
+
+    def load(self, token):
+        """
+        Look up the machine state of a session.
+
+        :param token: A session token returned by save.
+        :return: The MachineState, or None if the token is unknown or expired.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT positions, key FROM sessions WHERE token = ? AND expires > ?", (token, self.clock())
+            ).fetchone()
+        if row is None:
+            return None
+        positions, key = row
+        return MachineState(tuple(json.loads(positions)), _decode_key(key))
+
+    def delete(self, token):
+        """
+        Forget a session.
+
+        :param token: A session token.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._connection.close()
+
+
+def open_session_store(spec, ttl=DEFAULT_TTL):
+    """
+    Create a session store from a short description, as used for configuration.
+
+    :param spec: "memory", or "sqlite:" followed by a database path (e.g., "sqlite:sessions.db").
+    :param ttl: Seconds a session stays valid.
+    :return: A MemorySessionStore or SQLiteSessionStore.
+    """
+    if spec == "memory":
+        return MemorySessionStore(ttl=ttl)
+    if spec.startswith("sqlite:"):
+        return SQLiteSessionStore(spec[len("sqlite:"):], ttl=ttl)
+    raise ValueError(f"Unknown session store: {spec!r}")
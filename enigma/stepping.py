@@ -0,0 +1,93 @@
+from functools import lru_cache
+
+STATES = 26 ** 3
+
+
+def state_index(left, middle, right):
+    """
+    Pack three rotor positions into a single state number.
+
+    :param left: Position (0-25) of the left rotor.
+    :param middle: Position (0-25) of the middle rotor.
+    :param right: Position (0-25) of the right rotor.
+    :return: The state number (0-17575).
+    """
+    return (left * 26 + middle) * 26 + right
+
+
+def state_positions(state):
+    """
+    Unpack a state number into rotor positions.
+
+    :param state: The state number (0-17575).
+    :return: A tuple of positions (left, middle, right).
+    """
+    left, rest = divmod(state, 676)
+    middle, right = divmod(rest, 26)
+    return left, middle, right
+
+
+def positions_after(left, middle, right, middle_notch, right_notch, count):
+    """
+    Compute the rotor positions after `count` key presses in constant time. This is
+    the one implementation of the stepping mechanism (double-stepping); every other
+    way of stepping the rotors is built on it.
+
+    - The right rotor steps on every key press.
+    - The middle rotor steps on presses where the right rotor sits at its notch.
+    - The middle rotor at its own notch steps again on the next press, taking the left
+      rotor with it (the double-step).
+
+    Arguments may also be NumPy arrays that broadcast together (see
+    enigma.vectorized.positions_grid); counts must then be at least 1.
+
+    :param left: Current position (0-25) of the left rotor.
+    :param middle: Current position (0-25) of the middle rotor.
+    :param right: Current position (0-25) of the right rotor.
+    :param middle_notch: Notch position (0-25) of the middle rotor.
+    :param right_notch: Notch position (0-25) of the right rotor.
+    :param count: Number of key presses (non-negative).
+    :return: A tuple of positions (left, middle, right).
+    """
+    if isinstance(count, int):
+        if count < 0:
+            raise ValueError("Cannot step rotors backwards")
+        if count == 0:
+            return left, middle, right
+
+    # Where the middle rotor starts on its notch, the first press double-steps; from
+    # then on the middle rotor is off its notch.
+    at_notch = middle == middle_notch
+    left, middle, right = left + at_notch, middle + at_notch, right + at_notch
+    count = count - at_notch
+
+    # Presses on which the right rotor is at its notch: first_carry, first_carry + 26, ...
+    first_carry = (right_notch - right) % 26 + 1
+    carries = (count - first_carry + 26) // 26
+
+    # The middle rotor reaches its notch on a carry and double-steps one press later,
+    # then again every 25 carries (650 presses).
+    first_double = first_carry + 26 * ((middle_notch - middle) % 26 - 1) + 1
+    doubles = (count - first_double) // 650 + 1
+    doubles = doubles * (doubles > 0)
+
+    return (left + doubles) % 26, (middle + carries + doubles) % 26, (right + count) % 26
+
+
+@lru_cache(maxsize=None)
+def step_table(middle_notch, right_notch):
+    """
+    Build the successor of every rotor state, one press of positions_after apart.
+    Only the middle and right notches matter.
+
+    :param middle_notch: Notch position (0-25) of the middle rotor.
+    :param right_notch: Notch position (0-25) of the right rotor.
+    :return: A tuple where entry s is the state following state s.
+    """
+    # A press moves the left rotor by 0 or 1 depending only on the middle and right
+    # positions, so 676 presses give the move from every state
+    moves = []
+    for middle in range(26):
+        for right in range(26):
+            moves.append(state_index(*positions_after(0, middle, right, middle_notch, right_notch, 1)))
+    return tuple((state - state % 676 + moves[state % 676]) % STATES for state in range(STATES))
@@ -0,0 +1,98 @@
+from functools import lru_cache
+
+from enigma.engine import fast_stack, slow_stack
+from enigma.plugboard import Plugboard
+from enigma.reflector import Reflector
+from enigma.rotor import Rotor
+from enigma.stepping import STATES, positions_after, state_index, state_positions, step_table  # noqa: F401
+
+KEYSTROKE_TABLE_CACHE_SIZE = 32
+
+IDENTITY = bytes(range(26))
+PADDING = bytes(range(26, 256))
+
+
+class KeystrokeTable:
+    """
+    The net letter permutation of a machine key (rotor order, ring settings,
+    reflector and plugboard) for every rotor state. Permutations are built
+    lazily, the first time a state is visited.
+    """
+
+    def __init__(self, rotors, reflector, plugboard, atlas=None):
+        """
+        Initialize the table. Only the wiring and ring settings of the components
+        are used; their positions are ignored.
+
+        :param rotors: A list of three Rotor objects [left, middle, right].
+        :param reflector: A Reflector object.
+        :param plugboard: A Plugboard object.
+        :param atlas: An optional enigma.atlas.Atlas to read unplugged permutations from.
+        """
+        self.rotors = rotors
+        self.reflector = reflector
+        self.plugboard = plugboard
+        self.atlas = atlas
+        _, middle, right = rotors
+        self.steps = step_table(middle.notch_index, right.notch_index)
+        self.permutations = [None] * STATES
+
+    def permutation(self, state):
+        """
+        Return the net permutation for a rotor state, building it if needed.
+
+        :param state: The state number (0-17575).
+        :return: A bytes object mapping each input index to its output index.
+        """
+        permutation = self.permutations[state]
+        if permutation is None:
+            permutation = self._build_permutation(state)
+            self.permutations[state] = permutation
+        return permutation
+
+    def _build_permutation(self, state):
+        # The shared components are never mutated, so tables can be filled from any thread
+        left, middle, right = (rotor.config for rotor in self.rotors)
+        left_offset, middle_offset, right_offset = (
+            (position - rotor.ring) % 26 for rotor, position in zip(self.rotors, state_positions(state))
+        )
+
+        if self.atlas is not None:
+            unplugged = self.atlas.permutation(
+                (left.number, middle.number, right.number),
+                self.reflector.reflector_type,
+                state_index(left_offset, middle_offset, right_offset),
+            )
+        else:
+            # Same composition as enigma.engine.encrypt
+            composite = slow_stack(left, middle, self.reflector.table + PADDING, left_offset, middle_offset)
+            unplugged = fast_stack(right, composite, right_offset)
+
+        plugboard = self.plugboard.table + PADDING
+        return IDENTITY.translate(plugboard).translate(unplugged + PADDING).translate(plugboard)
+
+    def build(self):
+        """
+        Build the permutations for every rotor state up front.
+        """
+        for state in range(STATES):
+            self.permutation(state)
+
+
+@lru_cache(maxsize=KEYSTROKE_TABLE_CACHE_SIZE)
+def keystroke_table(rotors, ring_settings, reflector, plugboard_connections):
+    """
+    Return the keystroke table for a machine key, reusing a recently built one.
+    Arguments must be hashable, as returned by Enigma.key().
+
+    :param rotors: A tuple of three rotor number strings (left, middle, right).
+    :param ring_settings: A string of three ring setting letters (e.g., "aaa").
+    :param reflector: A reflector string (e.g., "B").
+    :param plugboard_connections: Space-separated letter pairs (e.g., "ab cd").
+    :return: A KeystrokeTable for the key.
+    """
+    return KeystrokeTable(
+        [Rotor(number, "a", ring) for number, ring in zip(rotors, ring_settings)],
+        Reflector(reflector),
+        Plugboard(plugboard_connections),
+    )
@@ -0,0 +1,160 @@
+from enigma.engine import PADDING, slow_stack
+from enigma.stepping import positions_after
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional extra
+    np = None
+
+ORD_A = ord('a')
+ORD_Z = ord('z')
+
+
+def require_numpy():
+    """
+    Raise an informative error when NumPy is not installed.
+    """
+    if np is None:
+        raise ImportError("NumPy is required for vectorized processing (pip install numpy)")
+
+
+def rotor_positions(left, middle, right, middle_notch, right_notch, count):
+    """
+    Compute the rotor positions after each of the next `count` key presses in one shot.
+    This is the array form of enigma.stepping.positions_after.
+
+    :param left: Current position (0-25) of the left rotor.
+    :param middle: Current position (0-25) of the middle rotor.
+    :param right: Current position (0-25) of the right rotor.
+    :param middle_notch: Notch position (0-25) of the middle rotor.
+    :param right_notch: Notch position (0-25) of the right rotor.
+    :param count: Number of key presses.
+    :return: Three uint8 arrays (left, middle, right) of length `count`.
+    """
+    require_numpy()
+    presses = np.arange(1, count + 1, dtype=np.int64)
+    return tuple(
+        positions.astype(np.uint8)
+        for positions in positions_grid(left, middle, right, middle_notch, right_notch, presses)
+    )
+
+
+def positions_grid(left, middle, right, middle_notch, right_notch, presses):
+    """
+    The array form of enigma.stepping.positions_after, for any arguments that
+    broadcast together: for instance start positions and notches of shape (keys, 1)
+    against presses of shape (1, letters) give the positions of many machines at once.
+
+    :param left: Current positions (0-25) of the left rotor.
+    :param middle: Current positions (0-25) of the middle rotor.
+    :param right: Current positions (0-25) of the right rotor.
+    :param middle_notch: Notch positions (0-25) of the middle rotor.
+    :param right_notch: Notch positions (0-25) of the right rotor.
+    :param presses: Numbers of key presses (at least 1), as a signed integer array.
+    :return: Three arrays (left, middle, right) of the broadcast shape.
+    """
+    require_numpy()
+    return positions_after(left, middle, right, middle_notch, right_notch, presses)
+
+
+def _offset_rows(shifted):
+    # Per-offset rotor tables (shifted_forward or shifted_backward) as an (offset, letter) array
+    return np.frombuffer(b''.join(table[:26] for table in shifted), dtype=np.uint8).reshape(26, 26)
+
+
+def _stack_permutations(rotors, reflector, plugboard, stacks):
+    # The net permutation, plugboard included, for every right rotor offset around the
+    # slow stack of each (left * 26 + middle) position in `stacks`, as a
+    # (stack, right offset, letter) array
+    left, middle, right = rotors
+    reflector_table = reflector.table + PADDING
+    composites = np.frombuffer(b''.join(
+        slow_stack(left.config, middle.config, reflector_table,
+                   stack // 26 - left.ring, stack % 26 - middle.ring)
+        for stack in stacks.tolist()
+    ), dtype=np.uint8).reshape(len(stacks), 26)
+
+    # Through the right rotor and the slow stack, and back through the right rotor
+    forward = _offset_rows(right.config.shifted_forward)
+    backward = _offset_rows(right.config.shifted_backward)
+    unplugged = backward[np.arange(26)[:, np.newaxis], composites[:, forward]]
+
+    plugboard_table = np.frombuffer(plugboard.table, dtype=np.uint8)
+    return plugboard_table[unplugged[:, :, plugboard_table]]
+
+
+def encipher_array(rotors, reflector, plugboard, indices):
+    """
+    Encipher an array of letter indices, stepping the rotors before each letter exactly
+    like Enigma.process. The components are not modified.
+
+    The left and middle rotors only move on presses where the right rotor leaves its
+    notch and on the press after, so their positions are worked out for those presses
+    alone. The permutations for each left and middle position in the text are composed
+    once, and every letter is then a single lookup.
+
+    :param rotors: A list of three Rotor objects [left, middle, right] at their current positions.
+    :param reflector: A Reflector object.
+    :param plugboard: A Plugboard object.
+    :param indices: A uint8 array of alphabet indices (0-25).
+    :return: A tuple (output, positions) where output is a uint8 array of alphabet indices
+             and positions holds the (left, middle, right) positions after the last letter.
+    """
+    require_numpy()
+    left, middle, right = rotors
+    count = len(indices)
+    if not count:
+        return np.zeros(0, dtype=np.uint8), tuple(rotor.position for rotor in rotors)
+
+    # Presses that may move the left or middle rotor: the first, those where the right
+    # rotor is at its notch, and the ones right after, in order
+    carries = np.arange((right.notch_index - right.position) % 26 + 1, count + 1, 26)
+    presses = np.stack((carries, carries + 1), axis=1).ravel()
+    if not len(presses) or presses[0] != 1:
+        presses = np.concatenate(([1], presses))
+    presses = presses[presses <= count]
+    slow_left, slow_middle, _ = positions_grid(left.position, middle.position, right.position,
+                                               middle.notch_index, right.notch_index, presses)
+    slow = slow_left * 26 + slow_middle
+
+    # Number the left and middle positions that occur, and compose their permutations
+    used = np.zeros(676, dtype=bool)
+    used[slow] = True
+    stacks = np.flatnonzero(used)
+    numbers = np.zeros(676, dtype=np.int32)
+    numbers[stacks] = np.arange(len(stacks), dtype=np.int32)
+    permutations = _stack_permutations(rotors, reflector, plugboard, stacks)
+
+    # Flat index of each letter in the (stack, right offset, letter) permutations: the
+    # stack is held from one of those presses to the next and the right rotor steps
+    # on every press
+    right_offsets = (right.position + 1 - right.ring + np.arange(26, dtype=np.int32)) % 26
+    slots = np.repeat(numbers[slow] * 676, np.diff(np.append(presses, count + 1)))
+    slots += np.tile(right_offsets * 26, count // 26 + 1)[:count]
+    slots += indices
+    letters = permutations.ravel()[slots]
+
+    final = positions_after(left.position, middle.position, right.position,
+                            middle.notch_index, right.notch_index, count)
+    return letters, final
+
+
+def encipher_text(rotors, reflector, plugboard, text):
+    """
+    Encipher a string like Enigma.process: the text is lower-cased, letters are
+    enciphered and every other character is put back unchanged.
+
+    :param rotors: A list of three Rotor objects [left, middle, right] at their current positions.
+    :param reflector: A Reflector object.
+    :param plugboard: A Plugboard object.
+    :param text: The input text (string).
+    :return: A tuple (output, positions) with the output string and the final rotor positions.
+    """
+    require_numpy()
+    codes = np.frombuffer(text.lower().encode('utf-32-le'), dtype=np.uint32).copy()
+    mask = (codes >= ORD_A) & (codes <= ORD_Z)
+
+    letters, final = encipher_array(rotors, reflector, plugboard, (codes[mask] - ORD_A).astype(np.uint8))
+    codes[mask] = letters + ORD_A
+
+    return codes.tobytes().decode('utf-32-le'), final
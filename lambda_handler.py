@@ -0,0 +1,156 @@
+import base64
+import json
+import os
+
+from enigma import metrics
+from enigma.cache import MachineCache
+
+# Settings fields holding lists of letters or rotor numbers, as in main.MachineSettings
+LIST_FIELDS = ("rotors", "initial_positions", "ring_settings")
+
+machine_cache = MachineCache(maxsize=128)
+
+# Counted letters show up on /metrics once the app is loaded; as in main.py,
+# ENIGMA_PROCESS_METRICS=0 turns the counters off
+metrics.enable(os.environ.get("ENIGMA_PROCESS_METRICS", "1") != "0")
+
+
+def batch_job(text, rotors=("I", "II", "III"), initial_positions=("A", "A", "A"),
+              ring_settings=("A", "A", "A"), reflector="B", plugboard_connections="AB CD"):
+    """
+    Build a job for POST /api/batch or for invoking the handler directly.
+
+    :param text: The text to encrypt.
+    :param rotors: Three rotor numbers (left, middle, right).
+    :param initial_positions: Three start position letters.
+    :param ring_settings: Three ring setting letters.
+    :param reflector: The reflector type.
+    :param plugboard_connections: Space-separated letter pairs.
+    :return: A dict with "settings" and "text".
+    """
+    return {
+        "settings": {
+            "rotors": list(rotors),
+            "initial_positions": list(initial_positions),
+            "ring_settings": list(ring_settings),
+            "reflector": reflector,
+            "plugboard_connections": plugboard_connections,
+        },
+        "text": text,
+    }
+
+
+def http_event(method, path, body=""):
+    """
+    Build an API Gateway HTTP API (payload version 2.0) event, for instance to try
+    the handler locally.
+
+    :param method: The HTTP method (e.g., "POST").
+    :param path: The request path (e.g., "/api/batch").
+    :param body: The request body.
+    :return: The event.
+    """
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost", "content-type": "application/json"},
+        "requestContext": {
+            "http": {"method": method, "path": path, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1",
+                     "userAgent": "local"},
+            "stage": "$default",
+            "requestId": "local",
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def _is_job(job):
+    # Only well-formed jobs take the fast path; main answers the others with its usual errors
+    if not isinstance(job, dict) or not isinstance(job.get("text"), str):
+        return False
+    settings = job.get("settings")
+    if not isinstance(settings, dict) or not isinstance(settings.get("reflector"), str):
+        return False
+    if not isinstance(settings.get("plugboard_connections", ""), str):
+        return False
+    return all(isinstance(settings.get(field), list) and all(isinstance(item, str) for item in settings[field])
+               for field in LIST_FIELDS)
+
+
+def encrypt_job(job):
+    """
+    Encrypt one job, as POST /api/batch does.
+
+    :param job: A dict with "settings" (the machine settings) and "text".
+    :return: A dict with the "ciphertext", or the "error".
+    """
+    settings = job["settings"]
+    try:
+        enigma = machine_cache.get(
+            rotors=settings["rotors"],
+            initial_positions=[x.lower() for x in settings["initial_positions"]],
+            ring_settings=[x.lower() for x in settings["ring_settings"]],
+            reflector=settings["reflector"],
+            plugboard_connections=settings.get("plugboard_connections", ""),
+        )
+        return {"ciphertext": enigma.process_with_table(job["text"])}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _http_request(event):
+    # Method and path of an API Gateway (REST or HTTP API) or function URL event
+    http = event.get("requestContext", {}).get("http")
+    if http is not None:
+        return http.get("method"), event.get("rawPath")
+    return event.get("httpMethod"), event.get("path")
+
+
+def _batch_jobs(event):
+    # The jobs of a POST /api/batch event, or None if the app has to answer it
+    if _http_request(event) != ("POST", "/api/batch"):
+        return None
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body)
+    try:
+        jobs = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(jobs, list) or not all(_is_job(job) for job in jobs):
+        return None
+    return jobs
+
+
+def handler(event, context):
+    """
+    Handle a Lambda event. POST /api/batch events, and events invoking the function
+    directly with a job ({"settings": {...}, "text": "..."}) or a list of jobs, are
+    answered with nothing but the enigma package loaded. Any other event, such as a
+    page request, goes to the FastAPI app in main.py, imported when the first one arrives.
+
+    Set the function handler to "lambda_handler.handler" to use it.
+
+    :param event: The event (an HTTP event, or a job or list of jobs).
+    :param context: The Lambda context.
+    :return: The response.
+    """
+    if _is_job(event):
+        return encrypt_job(event)
+    if isinstance(event, list) and all(_is_job(job) for job in event):
+        return [encrypt_job(job) for job in event]
+
+    jobs = _batch_jobs(event)
+    if jobs is not None:
+        return {
+            "statusCode": 200,
+            "headers": {"content-type": "application/json"},
+            "body": json.dumps([encrypt_job(job) for job in jobs], ensure_ascii=False, separators=(",", ":")),
+            "isBase64Encoded": False,
+        }
+
+    import main
+    return main.handler(event, context)
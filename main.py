@@ -1,21 +1,128 @@
+import json
+import os
+import string
+import time
+from collections import deque
+from typing import List
+
 from mangum import Mangum
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, Response
+from pydantic import BaseModel
+
+from starlette.routing import Match
 
-from enigma.machine import Enigma
+from enigma import metrics
+from enigma.cache import MachineCache
+from enigma.engine import LETTER_INDEX
+from enigma.session import open_session_store
+from enigma.table import state_index, state_positions
 
 app = FastAPI()
 
-templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+class LazyStaticFiles:
+    """
+    Serve static files, setting up the file server on the first request, so that
+    processes answering only the JSON API never pay for it.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize the mount.
+
+        :param directory: The directory of the static files.
+        """
+        self.directory = directory
+        self.files = None
+
+    async def __call__(self, scope, receive, send):
+        if self.files is None:
+            from fastapi.staticfiles import StaticFiles
+            self.files = StaticFiles(directory=self.directory)
+        await self.files(scope, receive, send)
+
+
+app.mount("/static", LazyStaticFiles("static"), name="static")
+
+_templates = None
+
+
+def get_templates():
+    """
+    Return the page templates. Jinja2 is loaded and the page template compiled on
+    first use, when the first HTML route is hit, rather than at import.
+
+    :return: The Jinja2Templates.
+    """
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        templates = Jinja2Templates(directory="templates")
+        # Templates do not change while the app runs: compile once, never re-check the file
+        templates.env.auto_reload = False
+        templates.get_template("index.html")
+        _templates = templates
+    return _templates
 
 handler = Mangum(app)
 
+machine_cache = MachineCache(maxsize=128)
+
+# Where continuation tokens of POST / are kept: "memory" or "sqlite:<path>"
+session_store = open_session_store(os.environ.get("ENIGMA_SESSION_STORE", "memory"),
+                                   ttl=float(os.environ.get("ENIGMA_SESSION_TTL", "3600")))
+
+# Machine states kept per WebSocket connection for backspace
+KEYSTROKE_HISTORY = 10000
+
+# Counters inside Enigma.process, process_with_table and type_keys; set ENIGMA_PROCESS_METRICS=0 to turn them off
+metrics.enable(os.environ.get("ENIGMA_PROCESS_METRICS", "1") != "0")
+
+REQUESTS = metrics.REGISTRY.counter(
+    "enigma_http_requests_total", "HTTP requests handled.", ("method", "path", "status"))
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "enigma_http_request_seconds", "HTTP request latency in seconds.", ("method", "path"))
+PHASE_SECONDS = metrics.REGISTRY.histogram(
+    "enigma_phase_seconds", "Seconds spent in machine construction, processing and template rendering.", ("phase",))
+ERRORS = metrics.REGISTRY.counter(
+    "enigma_errors_total", "Encoding errors by exception type.", ("type",))
+
+
+class MachineSettings(BaseModel):
+    rotors: List[str]
+    initial_positions: List[str]
+    ring_settings: List[str]
+    reflector: str
+    plugboard_connections: str = ""
+
+
+class BatchJob(BaseModel):
+    settings: MachineSettings
+    text: str
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    # Label by route rather than raw path, so unknown URLs do not add label values
+    path = "other"
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            path = route.path
+            break
+
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    REQUEST_SECONDS.observe(elapsed, (request.method, path))
+    REQUESTS.inc(labels=(request.method, path, str(response.status_code)))
+    return response
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_form(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
 
 
 @app.post("/")
@@ -42,7 +149,12 @@ async def encode(
         reflector: str = Form(...),
 
         # Plugboard settings
-        plugboard_connections: str = Form("")
+        plugboard_connections: str = Form(""),
+
+        # Continuation token of a previous part of the message, and whether to save
+        # the rotor state so that a later part can continue from it
+        session: str = Form(""),
+        keep_session: bool = Form(False)
 ):
 
     try:
@@ -51,40 +163,54 @@ async def encode(
         initial_positions = [x.lower() for x in (left_initial_position, center_initial_position, right_initial_position)]
         ring_settings = [x.lower() for x in (left_ring_setting, center_ring_setting, right_ring_setting)]
 
-        enigma = Enigma(
-            rotors=rotors,
-            initial_positions=initial_positions,
-            ring_settings=ring_settings,
-            reflector=reflector,
-            plugboard_connections=plugboard_connections,
-        )
+        with PHASE_SECONDS.time(("construction",)):
+            enigma = machine_cache.get(
+                rotors=rotors,
+                initial_positions=initial_positions,
+                ring_settings=ring_settings,
+                reflector=reflector,
+                plugboard_connections=plugboard_connections,
+            )
+            if session:
+                # Continue from where the previous part left the rotors
+                state = session_store.load(session)
+                if state is None:
+                    raise ValueError("Unknown or expired session")
+                enigma.restore(state)
 
         # Encrypt the provided plaintext
-        ciphertext = enigma.process(plaintext)
+        with PHASE_SECONDS.time(("process",)):
+            ciphertext = enigma.process(plaintext)
+        # Only messages sent in parts keep state on the server
+        session = session_store.save(enigma.snapshot()) if keep_session or session else ""
         # ciphertext = plaintext
 
         # Render the template with results
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "plaintext": plaintext,
-                "ciphertext": ciphertext,
-                "left_rotor": left_rotor,
-                "center_rotor": center_rotor,
-                "right_rotor": right_rotor,
-                "left_initial_position": left_initial_position,
-                "center_initial_position": center_initial_position,
-                "right_initial_position": right_initial_position,
-                "left_ring_setting": left_ring_setting,
-                "center_ring_setting": center_ring_setting,
-                "right_ring_setting": right_ring_setting,
-                "reflector": reflector,
-                "plugboard_connections": plugboard_connections,
-            }
-        )
+        with PHASE_SECONDS.time(("render",)):
+            response = get_templates().TemplateResponse(
+                "index.html",
+                {
+                    "request": request,
+                    "plaintext": plaintext,
+                    "ciphertext": ciphertext,
+                    "left_rotor": left_rotor,
+                    "center_rotor": center_rotor,
+                    "right_rotor": right_rotor,
+                    "left_initial_position": left_initial_position,
+                    "center_initial_position": center_initial_position,
+                    "right_initial_position": right_initial_position,
+                    "left_ring_setting": left_ring_setting,
+                    "center_ring_setting": center_ring_setting,
+                    "right_ring_setting": right_ring_setting,
+                    "reflector": reflector,
+                    "plugboard_connections": plugboard_connections,
+                    "session": session,
+                }
+            )
+        return response
     except Exception as e:
-        return templates.TemplateResponse(
+        ERRORS.inc(labels=(type(e).__name__,))
+        return get_templates().TemplateResponse(
             "index.html",
             {
                 "request": request,
@@ -102,5 +228,139 @@ async def encode(
                 "right_ring_setting": right_ring_setting,
                 "reflector": reflector,
                 "plugboard_connections": plugboard_connections,
+                # Keep the token so the part can be sent again once the error is fixed
+                "session": session,
             }
-        )
\ No newline at end of file
+        )
+
+
+@app.post("/api/batch")
+async def encode_batch(jobs: List[BatchJob]):
+    results = []
+    for job in jobs:
+        settings = job.settings
+        try:
+            with PHASE_SECONDS.time(("construction",)):
+                enigma = machine_cache.get(
+                    rotors=settings.rotors,
+                    initial_positions=[x.lower() for x in settings.initial_positions],
+                    ring_settings=[x.lower() for x in settings.ring_settings],
+                    reflector=settings.reflector,
+                    plugboard_connections=settings.plugboard_connections,
+                )
+            with PHASE_SECONDS.time(("process",)):
+                ciphertext = enigma.process_with_table(job.text)
+            results.append({"ciphertext": ciphertext})
+        except Exception as e:
+            ERRORS.inc(labels=(type(e).__name__,))
+            results.append({"error": str(e)})
+
+    return results
+
+
+@app.get("/api/cache")
+async def cache_info():
+    return machine_cache.info()
+
+
+def state_letters(state):
+    return ''.join(string.ascii_lowercase[position] for position in state_positions(state))
+
+
+def type_keys(table, state, text, history):
+    """
+    Encipher typed characters one at a time on a keystroke table, as Enigma.process
+    would, saving the rotor state before each character so it can be taken back.
+
+    :param table: The KeystrokeTable of the connection's machine.
+    :param state: The rotor state number before the first character.
+    :param text: The typed characters.
+    :param history: A deque the state before each character is appended to.
+    :return: A tuple (output, state) with the output and the state after the last letter.
+    """
+    steps = table.steps
+    permutations = table.permutations
+    output = []
+    letters = 0
+    for character in text:
+        history.append(state)
+        for letter in character.lower():
+            index = LETTER_INDEX.get(letter)
+            if index is None:
+                output.append(letter)
+                continue
+            state = steps[state]
+            output.append(string.ascii_lowercase[(permutations[state] or table.permutation(state))[index]])
+            letters += 1
+
+    if metrics.enabled:
+        metrics.LETTERS_PROCESSED.inc(letters)
+    return ''.join(output), state
+
+
+@app.websocket("/ws")
+async def live_encode(websocket: WebSocket):
+    """
+    Live encryption over a WebSocket, one machine per connection. Messages are JSON:
+
+    - {"type": "settings", ...MachineSettings fields} sets up the machine;
+    - {"type": "key", "text": "h"} enciphers the typed characters from the current state;
+    - {"type": "backspace", "count": 1} rewinds the machine by that many characters.
+
+    Each message is answered with the output (or an error) and the rotor positions.
+    """
+    await websocket.accept()
+    # The connection's machine is its keystroke table (cached per key) and a rotor state
+    table = None
+    state = None
+    history = deque(maxlen=KEYSTROKE_HISTORY)
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict):
+                    raise ValueError("Messages must be JSON objects")
+                kind = message.get("type")
+                if kind == "settings":
+                    settings = MachineSettings(**{key: value for key, value in message.items() if key != "type"})
+                    with PHASE_SECONDS.time(("construction",)):
+                        enigma = machine_cache.get(
+                            rotors=settings.rotors,
+                            initial_positions=[x.lower() for x in settings.initial_positions],
+                            ring_settings=[x.lower() for x in settings.ring_settings],
+                            reflector=settings.reflector,
+                            plugboard_connections=settings.plugboard_connections,
+                        )
+                        table = enigma.keystroke_table()
+                    state = state_index(*(rotor.position for rotor in enigma.rotors))
+                    history.clear()
+                    reply = {"type": "ready"}
+                elif table is None:
+                    raise ValueError("Send the machine settings first")
+                elif kind == "key":
+                    with PHASE_SECONDS.time(("process",)):
+                        output, state = type_keys(table, state, message["text"], history)
+                    reply = {"type": "output", "text": output}
+                elif kind == "backspace":
+                    # Return to the state saved before the earliest character removed
+                    count = max(0, min(int(message.get("count", 1)), len(history)))
+                    for _ in range(count):
+                        state = history.pop()
+                    reply = {"type": "rewind", "count": count}
+                else:
+                    raise ValueError(f"Unknown message type: {kind!r}")
+
+                reply["positions"] = state_letters(state)
+            except Exception as e:
+                ERRORS.inc(labels=(type(e).__name__,))
+                reply = {"type": "error", "error": str(e)}
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/metrics")
+async def read_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,94 @@
+# test_atlas.py
+
+import os
+import tempfile
+import unittest
+from enigma.atlas import Atlas, build_atlas
+from enigma.machine import Enigma
+from enigma.table import keystroke_table, state_index
+
+
+class TestAtlas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "atlas.bin")
+        build_atlas(cls.path, rotor_orders=[("I", "II", "III"), ("V", "I", "IV")], reflectors=["B", "C"])
+        cls.atlas = Atlas(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.atlas.close()
+        cls.directory.cleanup()
+
+    def test_index_header(self):
+        """
+        The header lists the rotor orders and reflectors that were built.
+        """
+        self.assertEqual({("I", "II", "III"): 0, ("V", "I", "IV"): 1}, self.atlas.rotor_orders)
+        self.assertEqual({"B": 0, "C": 1}, self.atlas.reflectors)
+        self.assertEqual(0, self.atlas.data_offset % 4096)
+
+    def test_permutations_match_computed_tables(self):
+        """
+        Atlas rows are the unplugged permutations for rotor offsets.
+        """
+        table = keystroke_table(("V", "I", "IV"), "aaa", "C", "")
+        for state in (0, 1, 4567, 17575):
+            self.assertEqual(table.permutation(state), self.atlas.permutation(("V", "I", "IV"), "C", state))
+
+    def test_machine_can_process_with_atlas(self):
+        """
+        Processing with atlas-backed tables matches process() for any ring setting and plugboard.
+        """
+        text = "Reconnaissance flight at noon, grid 17." * 20
+        reference = Enigma(["V", "I", "IV"], "qzk", "dmw", "C", "ab cd ez")
+        enigma = Enigma(["V", "I", "IV"], "qzk", "dmw", "C", "ab cd ez")
+        self.assertEqual(reference.process(text), enigma.process_with_table(text, atlas=self.atlas))
+        self.assertEqual(reference.snapshot(), enigma.snapshot())
+
+    def test_block_view(self):
+        """
+        A block holds every state's permutation back to back.
+        """
+        with self.atlas.block(("I", "II", "III"), "B") as block:
+            state = state_index(3, 4, 5)
+            self.assertEqual(self.atlas.permutation(("I", "II", "III"), "B", state),
+                             bytes(block[state * 26:state * 26 + 26]))
+
+    def test_missing_key(self):
+        """
+        Keys outside the atlas raise KeyError.
+        """
+        with self.assertRaises(KeyError):
+            self.atlas.keystroke_table(("I", "II", "IV"), "aaa", "B", "")
+        with self.assertRaises(KeyError):
+            self.atlas.permutation(("I", "II", "III"), "A", 0)
+
+    def test_rejects_other_files(self):
+        """
+        Opening a file that is not an atlas fails.
+        """
+        path = os.path.join(self.directory.name, "other.bin")
+        with open(path, "wb") as file:
+            file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            Atlas(path)
+
+    def test_rejects_truncated_files(self):
+        """
+        An atlas shorter than its header says is rejected on open.
+        """
+        path = os.path.join(self.directory.name, "truncated.bin")
+        with open(self.path, "rb") as source, open(path, "wb") as file:
+            file.write(source.read(os.path.getsize(self.path) - 26))
+        with self.assertRaisesRegex(ValueError, "Truncated"):
+            Atlas(path)
+        open(path, "wb").close()
+        with self.assertRaises(ValueError):
+            Atlas(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# test_attack.py
+
+import unittest
+from unittest import mock
+from enigma.attack import attack, climb_plugboard, index_of_coincidence, keystroke_permutations
+from enigma.machine import Enigma
+from enigma.plugboard import PlugboardHypothesis
+from enigma.scoring import NgramModel, letter_indices
+from enigma.table import keystroke_table, state_index
+
+PLAINTEXT = (
+    "the enigma machine is a cipher device developed and used in the early to mid twentieth century "
+    "to protect commercial diplomatic and military communication it was employed extensively by nazi "
+    "germany during world war two in all branches of the german military the enigma machine was "
+    "considered so secure that it was used to encipher the most top secret messages the enigma has an "
+    "electromechanical rotor mechanism that scrambles the twenty six letters of the alphabet"
+).replace(" ", "")
+
+
+class TestAttack(unittest.TestCase):
+
+    def setUp(self):
+        self.ciphertext = Enigma(["I", "II", "III"], "qsk", "abc", "B", "ab cd ef").process(PLAINTEXT)
+        self.model = NgramModel.from_text(PLAINTEXT, 3)
+        # Start positions with rings "aaa" that give the same rotor offsets as "qsk" with "abc"
+        self.positions = ["qrk", "aaa", "zzz", "bcd"] + ["qr" + letter for letter in "abcdefghij"]
+
+    def test_index_of_coincidence(self):
+        """
+        Natural language has a higher index of coincidence than its encryption.
+        """
+        self.assertEqual(1.0, index_of_coincidence([3, 3, 3]))
+        self.assertEqual(0.0, index_of_coincidence([1]))
+        self.assertGreater(index_of_coincidence(letter_indices(PLAINTEXT)),
+                           index_of_coincidence(letter_indices(self.ciphertext)) + 0.02)
+
+    def test_climb_plugboard(self):
+        """
+        With the rotor settings known, hill climbing recovers the plugboard pairs.
+        """
+        table = keystroke_table(("I", "II", "III"), "abc", "B", "")
+        ciphertext = letter_indices(self.ciphertext)
+        permutations = keystroke_permutations(table, state_index(16, 18, 10), len(ciphertext))
+        score, plugboard = climb_plugboard(ciphertext, permutations, self.model)
+        self.assertEqual("ab cd ef", plugboard.connections)
+        self.assertAlmostEqual(self.model.score(letter_indices(PLAINTEXT)), score, places=2)
+
+    def test_climb_plugboard_repairs_a_wrong_start(self):
+        """
+        Starting from wrong pairs, the climber disconnects and re-pairs letters as needed.
+        """
+        table = keystroke_table(("I", "II", "III"), "abc", "B", "")
+        ciphertext = letter_indices(self.ciphertext)
+        permutations = keystroke_permutations(table, state_index(16, 18, 10), len(ciphertext))
+        _, plugboard = climb_plugboard(ciphertext, permutations, self.model, max_pairs=3,
+                                       plugboard=PlugboardHypothesis("ac bd xy"))
+        self.assertEqual("ab cd ef", plugboard.connections)
+
+    def test_climb_plugboard_without_numpy(self):
+        """
+        Rescoring only the positions a move touches finds the same plugboard as scoring
+        every move at once with NumPy.
+        """
+        table = keystroke_table(("I", "II", "III"), "abc", "B", "")
+        ciphertext = letter_indices(self.ciphertext)
+        permutations = keystroke_permutations(table, state_index(16, 18, 10), len(ciphertext))
+        for start in (None, "ac bd xy"):
+            expected = climb_plugboard(ciphertext, permutations, self.model, max_pairs=3,
+                                       plugboard=start and PlugboardHypothesis(start))
+            with mock.patch("enigma.attack.np", None):
+                score, plugboard = climb_plugboard(ciphertext, permutations, self.model, max_pairs=3,
+                                                   plugboard=start and PlugboardHypothesis(start))
+            self.assertEqual(expected[1].connections, plugboard.connections)
+            self.assertAlmostEqual(expected[0], score, places=2)
+
+    def test_attack_recovers_plaintext(self):
+        """
+        The best candidate decrypts the message, and its settings work on a real machine.
+        """
+        candidates = list(attack(self.ciphertext, self.model, rotor_orders=[("II", "I", "III"), ("I", "II", "III")],
+                                 positions=self.positions, best=3, workers=1))
+        best = max(candidates, key=lambda candidate: candidate.score)
+        self.assertEqual(PLAINTEXT, best.plaintext)
+        self.assertEqual(("I", "II", "III"), best.rotors)
+        self.assertEqual("ab cd ef", best.plugboard)
+
+        enigma = Enigma(list(best.rotors), best.positions, best.ring_settings, best.reflector, best.plugboard)
+        self.assertEqual(PLAINTEXT, enigma.process(self.ciphertext))
+
+    def test_attack_streams_improvements(self):
+        """
+        Candidates are yielded only when they enter the running best, across worker processes.
+        """
+        candidates = list(attack(self.ciphertext, self.model, rotor_orders=[("I", "II", "III"), ("II", "I", "III")],
+                                 positions=self.positions[:2], best=1, keep=1, max_pairs=0, workers=2))
+        self.assertTrue(1 <= len(candidates) <= 2)
+        scores = [candidate.score for candidate in candidates]
+        self.assertEqual(sorted(scores), scores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# test_bombe.py
+
+import unittest
+from enigma.bombe import Menu, Stop, run_bombe
+from enigma.machine import Enigma
+
+PLAINTEXT = "wettervorhersagebiskayanordwestwindstaerkefuenf"
+
+
+class TestBombe(unittest.TestCase):
+
+    def setUp(self):
+        enigma = Enigma(["II", "V", "III"], "kdq", "aaa", "B", "ab cd ef gh ij kl")
+        self.ciphertext = enigma.process(PLAINTEXT)
+        self.crib = PLAINTEXT[:25]
+
+    def test_menu_structure(self):
+        """
+        Every crib letter pair becomes an edge and the menu reports its loops.
+        """
+        menu = Menu(self.ciphertext, self.crib)
+        self.assertEqual(25, sum(len(edges) for edges in menu.edges) // 2)
+        self.assertEqual(25, menu.length)
+        self.assertGreater(menu.loops, 0)
+        self.assertEqual(sorted(menu.components, key=len, reverse=True), menu.components)
+
+    def test_menu_rejects_clashing_crib(self):
+        """
+        A crib that puts a letter opposite itself cannot be right.
+        """
+        with self.assertRaises(ValueError):
+            Menu("abc", "xbz")
+        with self.assertRaises(ValueError):
+            Menu("abc", "xyzw")
+
+    def test_menu_rejects_non_letters(self):
+        """
+        Case does not matter, but any other character is named with its position.
+        """
+        self.assertEqual(3, Menu("ABC", "xYz").length)
+        with self.assertRaisesRegex(ValueError, r"Crib character ' ' at 2"):
+            Menu("abcd", "xy z")
+        with self.assertRaisesRegex(ValueError, r"Ciphertext character '1' at 1"):
+            Menu("a1c", "xyz")
+
+    def test_true_stop_survives(self):
+        """
+        Sweeping around the true key should leave only the true stop, with its plugboard.
+        """
+        positions = ["kd" + letter for letter in "abcdefghijklmnopqrstuvwxyz"] + ["aaa", "zzz", "qev"]
+        stops = run_bombe(self.ciphertext, self.crib, rotor_orders=[("II", "V", "III")],
+                          positions=positions, workers=1)
+        self.assertEqual([Stop(("II", "V", "III"), "B", "kdq", "ab cd ef gh ij kl")], stops)
+
+    def test_crib_at_offset(self):
+        """
+        A crib placed later in the message is tested at the right keystrokes.
+        """
+        stops = run_bombe(self.ciphertext, PLAINTEXT[20:45], offset=20,
+                          rotor_orders=[("II", "V", "III")], positions=["kdq", "kdr"], workers=1)
+        self.assertEqual(["kdq"], [stop.positions for stop in stops])
+
+    def test_wrong_rotor_orders_are_rejected(self):
+        """
+        Other rotor orders and reflectors at the same positions do not survive.
+        """
+        stops = run_bombe(self.ciphertext, self.crib, rotor_orders=[("V", "II", "III"), ("II", "V", "III")],
+                          reflectors=("B", "C"), positions=["kdq"], workers=2)
+        self.assertEqual([(("II", "V", "III"), "B")], [(stop.rotors, stop.reflector) for stop in stops])
+
+
+if __name__ == '__main__':
+    unittest.main()
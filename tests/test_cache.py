@@ -0,0 +1,99 @@
+# test_cache.py
+
+import threading
+import unittest
+from enigma.cache import MachineCache, normalize_settings
+from enigma.machine import Enigma
+
+
+class TestMachineCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MachineCache(maxsize=2)
+
+    def get(self, rotors=("I", "II", "III"), positions="aaa", plugboard="ab cd"):
+        return self.cache.get(list(rotors), positions, "bcd", "B", plugboard)
+
+    def test_machines_match_fresh_construction(self):
+        """
+        A cached machine should encrypt exactly like a newly built one.
+        """
+        self.get()
+        machine = self.get(positions="qev")
+        expected = Enigma(["I", "II", "III"], "qev", "bcd", "B", "ab cd").process("hello world")
+        self.assertEqual(expected, machine.process("hello world"))
+
+    def test_machines_do_not_share_rotor_state(self):
+        """
+        Processing with one machine must not move the rotors of another.
+        """
+        first = self.get()
+        second = self.get()
+        first.process("a" * 40)
+        self.assertEqual([0, 0, 0], [rotor.position for rotor in second.rotors])
+
+    def test_hit_and_miss_counters(self):
+        """
+        Equivalent settings should hit the same entry.
+        """
+        self.get(plugboard="ab cd")
+        self.get(plugboard="DC BA")
+        self.get(rotors=("III", "II", "I"))
+        self.assertEqual({"hits": 1, "misses": 2, "size": 2, "maxsize": 2}, self.cache.info())
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        The cache should never hold more than maxsize configurations.
+        """
+        self.get(rotors=("I", "II", "III"))
+        self.get(rotors=("II", "III", "IV"))
+        self.get(rotors=("I", "II", "III"))
+        self.get(rotors=("III", "IV", "V"))
+        self.get(rotors=("I", "II", "III"))
+        self.assertEqual(2, self.cache.info()["size"])
+        self.assertEqual(2, self.cache.hits)
+
+    def test_invalid_settings_are_not_cached(self):
+        """
+        Settings that fail to build a machine raise and leave the cache untouched.
+        """
+        with self.assertRaises(KeyError):
+            self.get(rotors=("VI", "II", "III"))
+        self.assertEqual(0, self.cache.info()["size"])
+
+    def test_normalize_settings(self):
+        """
+        Plugboard pairs and ring letters are put in canonical form.
+        """
+        self.assertEqual((("I", "II", "III"), "abc", "B", "ab cd"),
+                         normalize_settings(["I", "II", "III"], ["A", "B", "C"], "B", "DC BA"))
+
+    def test_malformed_ring_settings_are_rejected(self):
+        for ring_settings in (["aa", "b", ""], ["a", "b"], "abcd", ["a", "b", "1"]):
+            with self.assertRaises(ValueError):
+                normalize_settings(["I", "II", "III"], ring_settings, "B", "")
+        with self.assertRaises(ValueError):
+            self.cache.get(["I", "II", "III"], "aaa", ["aa", "b", ""], "B", "")
+        self.assertEqual(0, self.cache.info()["size"])
+
+    def test_concurrent_access(self):
+        """
+        Many threads sharing the cache should all get working machines.
+        """
+        expected = Enigma(["I", "II", "III"], "aaa", "bcd", "B", "ab cd").process("concurrency")
+        results = []
+
+        def worker():
+            for _ in range(50):
+                results.append(self.get().process("concurrency"))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([expected] * 200, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# test_engine.py
+
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from enigma.engine import compile_config, encrypt, slow_stack
+from enigma.machine import Enigma
+from enigma.reflector import Reflector
+from enigma.rotor import Rotor
+
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.config = compile_config(("III", "I", "IV"), "dkq", "C", "ab yz")
+
+    def make_enigma(self, positions="aev"):
+        return Enigma(["III", "I", "IV"], positions, "dkq", "C", "ab yz")
+
+    def test_encrypt_matches_process(self):
+        """
+        The pure function should give the same output and final positions as Enigma.process.
+        """
+        text = "Enemy sighted, bearing 045! " * 30
+        enigma = self.make_enigma()
+        expected = enigma.process(text)
+        output, positions, letters = encrypt(self.config, text, "aev")
+        self.assertEqual(expected, output)
+        self.assertEqual(tuple(rotor.position for rotor in enigma.rotors), positions)
+        self.assertEqual(sum(character.isalpha() for character in text), letters)
+
+    def test_final_positions_continue_the_message(self):
+        """
+        Feeding the final positions back in should continue the message seamlessly.
+        """
+        expected, _, _ = encrypt(self.config, "firstpartsecondpart", (0, 4, 21))
+        first, positions, _ = encrypt(self.config, "firstpart", (0, 4, 21))
+        second, _, _ = encrypt(self.config, "secondpart", positions)
+        self.assertEqual(expected, first + second)
+
+    def test_config_pickles_as_its_settings(self):
+        """
+        A config sent to another process should come back as the same compiled config.
+        """
+        config = self.make_enigma().config()
+        self.assertIs(self.config, pickle.loads(pickle.dumps(config)))
+        self.assertEqual(self.make_enigma().key(), config.key())
+        self.assertLess(len(pickle.dumps(config)), 200)
+
+    def test_machine_config_matches_compiled_config(self):
+        """
+        A machine's config should equal the compiled config for the same settings.
+        """
+        self.assertEqual(self.config, self.make_enigma().config())
+        self.assertIs(self.config, compile_config(("III", "I", "IV"), "dkq", "C", "ab yz"))
+
+    def test_invalid_settings(self):
+        """
+        Unknown rotors raise KeyError and a wrong number of rotors raises ValueError.
+        """
+        with self.assertRaises(KeyError):
+            compile_config(("VI", "I", "IV"), "aaa", "B", "")
+        with self.assertRaises(ValueError):
+            compile_config(("I", "IV"), "aa", "B", "")
+
+    def test_shared_config_across_threads(self):
+        """
+        Many threads may encrypt with one config concurrently.
+        """
+        text = "concurrent messages " * 20
+        expected = self.make_enigma().process(text)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: encrypt(self.config, text, "aev")[0], range(64)))
+        self.assertEqual([expected] * 64, results)
+
+    def test_slow_stack_matches_rotor_path(self):
+        """
+        The cached composite should equal passing through the middle rotor, left rotor,
+        reflector and back, at every pair of offsets tried.
+        """
+        reflector = Reflector("B")
+        for left_position, middle_position in ((0, 0), (5, 17), (25, 24)):
+            left = Rotor("II", "abcdefghijklmnopqrstuvwxyz"[left_position], "c")
+            middle = Rotor("V", "abcdefghijklmnopqrstuvwxyz"[middle_position], "x")
+            composite = slow_stack(left.config, middle.config, reflector.table + bytes(range(26, 256)),
+                                   left.position - left.ring, middle.position - middle.ring)
+            for contact in range(26):
+                index = left.encode_forward_index(middle.encode_forward_index(contact))
+                index = middle.encode_backward_index(left.encode_backward_index(reflector.reflect_index(index)))
+                self.assertEqual(index, composite[contact])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# test_kernel.py
+
+import unittest
+from enigma.attack import index_of_coincidence
+from enigma.kernel import KEY_COLUMNS, decrypt_keys, encode_key, encode_keys, score_keys, state_keys
+from enigma.machine import Enigma
+from enigma.scoring import NgramModel, letter_indices
+from enigma.table import state_index
+from enigma.vectorized import np
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+KEYS = [
+    (["I", "II", "III"], "aaa", "aaa", "B", ""),
+    (["II", "V", "III"], "kdq", "aaa", "B", "ab cd ef gh ij kl"),
+    (["IV", "I", "V"], "qev", "bxk", "C", "az by cx"),
+    (["V", "III", "II"], "zdu", "zzz", "A", "mq"),
+]
+
+
+@unittest.skipUnless(np is not None, "NumPy is not installed")
+class TestKernel(unittest.TestCase):
+
+    def setUp(self):
+        self.ciphertext = Enigma(["III", "I", "II"], "xyz", "aaa", "B", "").process("attackatdawn" * 80)
+
+    def test_encode_key(self):
+        """
+        A key row holds rotor and reflector numbers, positions, rings and the plugboard table.
+        """
+        row = encode_key(["II", "V", "III"], "kdq", "abc", "C", "ab")
+        self.assertEqual(KEY_COLUMNS, len(row))
+        self.assertEqual([1, 4, 2, 2, 10, 3, 16, 0, 1, 2, 1, 0, 2], row[:13])
+        with self.assertRaises(ValueError):
+            encode_key(["I", "II"], "aa", "aa", "B")
+
+    def test_decrypt_matches_process(self):
+        """
+        Every row of the batch should match a machine built for that key, across batches.
+        """
+        output = decrypt_keys(self.ciphertext, encode_keys(KEYS), batch_size=3)
+        self.assertEqual((len(KEYS), len(self.ciphertext)), output.shape)
+        for key, row in zip(KEYS, output):
+            expected = Enigma(*key).process(self.ciphertext)
+            self.assertEqual(expected, ''.join(ALPHABET[index] for index in row))
+
+    def test_scores(self):
+        """
+        Per-key scores are the index of coincidence or the n-gram score of each decryption.
+        """
+        keys = encode_keys(KEYS)
+        output = decrypt_keys(self.ciphertext, keys)
+        model = NgramModel.from_text("attack at dawn, retreat at dusk", 3)
+        for scores, score in ((score_keys(self.ciphertext, keys), index_of_coincidence),
+                              (score_keys(self.ciphertext, keys, model), model.score)):
+            for value, row in zip(scores, output):
+                self.assertAlmostEqual(score(row.tolist()), value, places=3)
+
+    def test_state_keys(self):
+        """
+        State keys sweep start positions of one key; the true start decrypts the message.
+        """
+        states = [state_index(23, 24, 25), state_index(0, 0, 0), state_index(25, 25, 25)]
+        keys = state_keys(["III", "I", "II"], "B", states)
+        self.assertEqual([[23, 24, 25], [0, 0, 0], [25, 25, 25]], keys[:, 4:7].tolist())
+        scores = score_keys(letter_indices(self.ciphertext), keys)
+        self.assertEqual(0, int(np.argmax(scores)))
+        self.assertEqual("attackatdawn", ''.join(ALPHABET[index] for index in decrypt_keys(self.ciphertext, keys)[0, :12]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+
+from enigma import metrics
+from enigma.machine import Enigma
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+os.chdir(ROOT)
+
+import lambda_handler
+from lambda_handler import batch_job, http_event
+
+
+def expected_ciphertext(text, positions="aaa"):
+    return Enigma(["I", "II", "III"], positions, "aaa", "B", "ab cd").process(text)
+
+
+def test_direct_invocation():
+    assert lambda_handler.handler(batch_job("HELLO WORLD"), None) == {"ciphertext": expected_ciphertext("HELLO WORLD")}
+    jobs = [batch_job("HELLO WORLD"), batch_job("ATTACK", initial_positions=("Q", "E", "V"))]
+    results = lambda_handler.handler(jobs, None)
+    assert results == [{"ciphertext": expected_ciphertext("HELLO WORLD")},
+                       {"ciphertext": expected_ciphertext("ATTACK", "qev")}]
+
+
+def test_batch_event_matches_the_app():
+    import main
+
+    jobs = [batch_job("HELLO WORLD"), batch_job("ATTACK", rotors=("VI", "II", "III"), initial_positions=("Q", "E", "V"))]
+    event = http_event("POST", "/api/batch", json.dumps(jobs))
+
+    response = lambda_handler.handler(event, None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == json.loads(main.handler(event, None)["body"])
+
+
+def test_base64_rest_api_event():
+    event = {
+        "httpMethod": "POST",
+        "path": "/api/batch",
+        "body": base64.b64encode(json.dumps([batch_job("HELLO WORLD")]).encode()).decode(),
+        "isBase64Encoded": True,
+    }
+    response = lambda_handler.handler(event, None)
+    assert json.loads(response["body"]) == [{"ciphertext": expected_ciphertext("HELLO WORLD")}]
+
+
+def test_other_events_go_to_the_app():
+    response = lambda_handler.handler(http_event("GET", "/"), None)
+    assert response["statusCode"] == 200
+    assert "Enigma Machine" in response["body"]
+
+    # Malformed jobs get the app's validation error
+    response = lambda_handler.handler(http_event("POST", "/api/batch", json.dumps([{"text": "HELLO"}])), None)
+    assert response["statusCode"] == 422
+
+
+def test_fast_path_does_not_load_the_web_stack():
+    script = ("import sys, lambda_handler; "
+              "lambda_handler.handler({'settings': {'rotors': ['I', 'II', 'III'], 'initial_positions': ['a', 'a', 'a'], "
+              "'ring_settings': ['a', 'a', 'a'], 'reflector': 'B'}, 'text': 'hello'}, None); "
+              "print(sorted(name for name in ('fastapi', 'jinja2', 'mangum', 'numpy') if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_fast_path_counts_letters():
+    before = metrics.LETTERS_PROCESSED.value()
+    lambda_handler.handler(batch_job("HELLO, WORLD"), None)
+    assert metrics.LETTERS_PROCESSED.value() - before == 10
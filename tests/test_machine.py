@@ -1,4 +1,9 @@
+import io
+import mmap
+import os
+import tempfile
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 from enigma.machine import Enigma, ALPHABET
 
 
@@ -135,6 +140,211 @@ class TestEnigmaMachine(unittest.TestCase):
         self.assertEqual(plaintext, recovered_text,
                          "Long message encryption/decryption failed to recover the original text.")
 
+    def test_known_ciphertext(self):
+        """
+        Rotors I-II-III at AAA with reflector B and no plugboard encrypt 'aaaaa' to 'bdzgo'.
+        """
+        self.assertEqual(self.enigma.process("aaaaa"), "bdzgo")
+
+    def test_encipher_index_does_not_step_rotors(self):
+        """
+        encipher_index should map a letter at the current positions without moving the rotors.
+        """
+        positions = [rotor.position for rotor in self.enigma.rotors]
+        first = self.enigma.encipher_index(0)
+        self.assertEqual(first, self.enigma.encipher_index(0))
+        self.assertEqual(positions, [rotor.position for rotor in self.enigma.rotors])
+
+    def test_encipher_index_matches_process(self):
+        """
+        After a step, encipher_index should give the letter process gives at that position.
+        """
+        enigma = Enigma(["IV", "II", "V"], "qdv", "bxm", "C", "ab cd ef gh")
+        reference = enigma.clone()
+        for letter in "enigmamachinequickbrownfox":
+            enigma.step_rotors()
+            self.assertEqual(reference.process(letter), ALPHABET[enigma.encipher_index(ALPHABET.index(letter))])
+
+    def test_position_after_matches_stepping(self):
+        """
+        position_after(n) should agree with stepping the rotors n times, across double steps,
+        and must not move the rotors itself.
+        """
+        enigma = Enigma(["III", "II", "I"], "aev", "aaa", "B", "")
+        start = [rotor.position for rotor in enigma.rotors]
+        for n in range(0, 1400, 7):
+            stepped = Enigma(["III", "II", "I"], "aev", "aaa", "B", "")
+            for _ in range(n):
+                stepped.step_rotors()
+            self.assertEqual(tuple(rotor.position for rotor in stepped.rotors), enigma.position_after(n))
+        self.assertEqual(start, [rotor.position for rotor in enigma.rotors])
+
+    def test_seek_continues_message(self):
+        """
+        Seeking past the first part of a message should decrypt the rest of it.
+        """
+        plaintext = "weatherreportnorainexpectedtoday"
+        ciphertext = self.enigma.process(plaintext)
+        enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                        self.default_reflector, self.default_plugboard)
+        enigma.seek(10)
+        self.assertEqual(plaintext[10:], enigma.process(ciphertext[10:]))
+
+    def test_seek_rejects_negative_offsets(self):
+        """
+        The rotors cannot be stepped backwards.
+        """
+        with self.assertRaises(ValueError):
+            self.enigma.seek(-1)
+
+    def test_process_parallel_matches_process(self):
+        """
+        Chunked multi-process encryption should give the same output and final positions
+        as process(), with non-letters left where they were.
+        """
+        text = "Convoy sails at 0600, course 270. " * 40
+        reference = Enigma(["IV", "II", "V"], "qev", "bdf", "C", "aq wz")
+        enigma = Enigma(["IV", "II", "V"], "qev", "bdf", "C", "aq wz")
+        self.assertEqual(reference.process(text), enigma.process_parallel(text, workers=2, chunk_size=100))
+        self.assertEqual([rotor.position for rotor in reference.rotors],
+                         [rotor.position for rotor in enigma.rotors])
+
+    def test_process_parallel_reuses_an_executor(self):
+        """
+        One pool passed in by the caller should serve several messages.
+        """
+        text = "Convoy sails at 0600, course 270. " * 40
+        reference = Enigma(["IV", "II", "V"], "qev", "bdf", "C", "aq wz")
+        enigma = Enigma(["IV", "II", "V"], "qev", "bdf", "C", "aq wz")
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for _ in range(2):
+                self.assertEqual(reference.process(text),
+                                 enigma.process_parallel(text, workers=2, chunk_size=100, executor=executor))
+
+    def test_process_stream_carries_state_across_chunks(self):
+        """
+        Chunks processed through process_stream should join up to the process() output.
+        """
+        chunks = ["Attack ", "at da", "", "wn!", " Hold the bridge."]
+        expected = self.enigma.process("".join(chunks))
+        enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                        self.default_reflector, self.default_plugboard)
+        output = list(enigma.process_stream(iter(chunks)))
+        self.assertEqual(len(chunks), len(output))
+        self.assertEqual(expected, "".join(output))
+
+    def test_process_file(self):
+        """
+        process_file should copy a processed file across in small chunks.
+        """
+        text = "Secret orders follow.\n" * 100
+        expected = self.enigma.process(text)
+        enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                        self.default_reflector, self.default_plugboard)
+        dst = io.StringIO()
+        enigma.process_file(io.StringIO(text), dst, chunk_size=7)
+        self.assertEqual(expected, dst.getvalue())
+
+    def test_process_bytes_matches_process(self):
+        """
+        process_bytes should treat ASCII bytes exactly as process() treats the decoded text.
+        """
+        text = "Hello, World! 123\n" * 20
+        expected = self.enigma.process(text).encode('ascii')
+        enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                        self.default_reflector, self.default_plugboard)
+        self.assertEqual(expected, enigma.process_bytes(text.encode('ascii')))
+
+    def test_process_into_in_place(self):
+        """
+        process_into should work with the same writable buffer as source and destination.
+        """
+        data = bytearray(b"Meet at the Old Mill, 22:00.")
+        expected = self.enigma.process(data.decode('ascii')).encode('ascii')
+        enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                        self.default_reflector, self.default_plugboard)
+        self.assertEqual(len(data), enigma.process_into(data, data))
+        self.assertEqual(expected, bytes(data))
+
+    def test_process_into_rejects_small_destination(self):
+        """
+        A destination buffer smaller than the source is an error.
+        """
+        with self.assertRaises(ValueError):
+            self.enigma.process_into(b"abc", bytearray(2))
+
+    def test_process_into_releases_buffers_on_error(self):
+        """
+        A failure partway through a buffer should not keep it exported, so a memory map
+        can still be closed and the original error is the one raised.
+        """
+        with tempfile.TemporaryFile() as file:
+            file.write(b"hello world")
+            file.flush()
+            error = None
+            with mmap.mmap(file.fileno(), 0) as mapped:
+                try:
+                    # The destination is read-only, so the first letter cannot be written
+                    self.enigma.process_into(mapped, bytes(len(mapped)))
+                except TypeError as e:
+                    # Keep the traceback, and the frames in it, alive past closing the map
+                    error = e
+            self.assertIsInstance(error, TypeError)
+
+    def test_process_mmap_in_place(self):
+        """
+        Encrypting a file in place through a memory map, in one process or split across
+        several, should match process() and leave the rotors in the same state.
+        """
+        text = "Panzer division moves north at dawn.\n" * 60
+        reference = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                           self.default_reflector, "ab cd")
+        expected = reference.process(text).encode('ascii')
+
+        for workers in (1, 3):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "intercept.txt")
+                with open(path, "wb") as file:
+                    file.write(text.encode('ascii'))
+
+                enigma = Enigma(self.default_rotors, self.default_positions, self.default_rings,
+                                self.default_reflector, "ab cd")
+                self.assertEqual(len(expected), enigma.process_mmap(path, page_size=100, workers=workers))
+                with open(path, "rb") as file:
+                    self.assertEqual(expected, file.read())
+                self.assertEqual([rotor.position for rotor in reference.rotors],
+                                 [rotor.position for rotor in enigma.rotors])
+
+    def test_snapshot_and_restore(self):
+        """
+        Restoring a snapshot should rewind the machine to the saved state.
+        """
+        self.enigma.process("rewind")
+        state = self.enigma.snapshot()
+        first = self.enigma.process("the same text twice")
+        self.enigma.restore(state)
+        self.assertEqual(first, self.enigma.process("the same text twice"))
+
+    def test_restore_rejects_other_keys(self):
+        """
+        A state saved from a machine with a different key cannot be restored.
+        """
+        other = Enigma(["V", "II", "III"], "aaa", "aaa", "B", "")
+        with self.assertRaises(ValueError):
+            self.enigma.restore(other.snapshot())
+
+    def test_clone_is_independent(self):
+        """
+        A clone starts in the same state but moves its rotors independently.
+        """
+        self.enigma.process("abc")
+        clone = self.enigma.clone()
+        self.assertEqual(self.enigma.snapshot(), clone.snapshot())
+        expected = self.enigma.process("independent")
+        self.assertEqual(expected, clone.process("independent"))
+        clone.process("more")
+        self.assertNotEqual(self.enigma.snapshot(), clone.snapshot())
+
 
 if __name__ == '__main__':
     unittest.main()
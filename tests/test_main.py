@@ -1,6 +1,9 @@
 import os
+import re
 from fastapi.testclient import TestClient
+from enigma import metrics
 from enigma.machine import Enigma
+from lambda_handler import batch_job
 
 os.chdir(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -94,4 +97,183 @@ def test_post_unexpected_rotor_value(monkeypatch):
     response = client.post("/", data=data)
     assert response.status_code == 200
     # The error should be handled and rendered in the response template.
-    assert "Invalid rotor configuration" in response.text
\ No newline at end of file
+    assert "Invalid rotor configuration" in response.text
+
+
+def test_batch_encrypts_each_job():
+    jobs = [
+        batch_job("HELLO WORLD"),
+        batch_job("ATTACK AT DAWN", initial_positions=("Q", "E", "V")),
+        batch_job("HELLO WORLD"),
+    ]
+    response = client.post("/api/batch", json=jobs)
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == 3
+    for job, result in zip(jobs, results):
+        settings = job["settings"]
+        enigma = Enigma(
+            rotors=settings["rotors"],
+            initial_positions=[x.lower() for x in settings["initial_positions"]],
+            ring_settings=[x.lower() for x in settings["ring_settings"]],
+            reflector=settings["reflector"],
+            plugboard_connections=settings["plugboard_connections"],
+        )
+        assert result == {"ciphertext": enigma.process(job["text"])}
+
+
+def test_batch_reports_errors_per_job():
+    bad_job = batch_job("HELLO WORLD")
+    bad_job["settings"]["rotors"] = ["VI", "II", "III"]
+    response = client.post("/api/batch", json=[bad_job, batch_job("HELLO WORLD")])
+    assert response.status_code == 200
+    results = response.json()
+    assert "error" in results[0]
+    assert "ciphertext" in results[1]
+
+
+def test_batch_rejects_malformed_jobs():
+    response = client.post("/api/batch", json=[{"text": "HELLO"}])
+    assert response.status_code == 422
+
+
+def test_cache_info():
+    client.post("/", data=get_valid_form_data())
+    client.post("/", data=get_valid_form_data())
+    response = client.get("/api/cache")
+    assert response.status_code == 200
+    info = response.json()
+    assert info["hits"] >= 1
+    assert info["size"] >= 1
+
+
+def test_metrics():
+    client.post("/", data=get_valid_form_data())
+    data = get_valid_form_data()
+    data["left_rotor"] = "IX"
+    client.post("/", data=data)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'enigma_http_requests_total{method="POST",path="/",status="200"}' in text
+    assert 'enigma_phase_seconds_count{phase="render"}' in text
+    assert 'enigma_phase_seconds_count{phase="construction"}' in text
+    assert 'enigma_errors_total{type="KeyError"}' in text
+    assert "enigma_letters_processed_total" in text
+
+
+def test_websocket_typing_and_backspace():
+    settings = {"type": "settings", "rotors": ["I", "II", "III"], "initial_positions": ["A", "A", "Z"],
+                "ring_settings": ["a", "a", "a"], "reflector": "B", "plugboard_connections": "ab cd"}
+    expected = Enigma(["I", "II", "III"], "aaz", "aaa", "B", "ab cd").process("Hello world")
+    mistyped = Enigma(["I", "II", "III"], "aaz", "aaa", "B", "ab cd").process("Hello wx")
+
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "key", "text": "h"})
+        assert websocket.receive_json()["type"] == "error"
+
+        websocket.send_json(settings)
+        assert websocket.receive_json() == {"type": "ready", "positions": "aaz"}
+
+        typed = ""
+        for character in "Hello wx":
+            websocket.send_json({"type": "key", "text": character})
+            reply = websocket.receive_json()
+            assert reply["type"] == "output"
+            typed += reply["text"]
+        assert typed == mistyped
+
+        websocket.send_json({"type": "backspace", "count": 1})
+        reply = websocket.receive_json()
+        assert reply["count"] == 1
+        typed = typed[:-1]
+
+        websocket.send_json({"type": "key", "text": "orld"})
+        typed += websocket.receive_json()["text"]
+        assert typed == expected
+
+        websocket.send_json({"type": "backspace", "count": 100})
+        assert websocket.receive_json() == {"type": "rewind", "count": 11, "positions": "aaz"}
+
+
+def session_token(text):
+    match = re.search(r'name="session" value="([^"]+)"', text)
+    return match.group(1) if match else None
+
+
+def test_post_continues_a_session():
+    expected = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "ab cd").process("HELLO WORLD AGAIN")
+
+    data = get_valid_form_data()
+    response = client.post("/", data=data)
+    assert session_token(response.text) is None
+
+    data["keep_session"] = "true"
+    response = client.post("/", data=data)
+    token = session_token(response.text)
+    assert token
+    assert expected[:11] in response.text
+
+    data["plaintext"] = " AGAIN"
+    data["session"] = token
+    del data["keep_session"]
+    response = client.post("/", data=data)
+    assert expected[11:] in response.text
+    assert session_token(response.text) not in (None, token)
+
+    # The first token still continues from the end of the first part
+    response = client.post("/", data=data)
+    assert expected[11:] in response.text
+
+    # A part that fails keeps the token, so it can be sent again
+    response = client.post("/", data={**data, "left_rotor": "VI"})
+    assert "Error:" in response.text
+    assert session_token(response.text) == token
+    response = client.post("/", data=data)
+    assert expected[11:] in response.text
+
+
+def test_post_rejects_unknown_session():
+    data = get_valid_form_data()
+    data["session"] = "no-such-token"
+    response = client.post("/", data=data)
+    assert "Error: Unknown or expired session" in response.text
+
+
+def test_websocket_rejects_bad_messages():
+    settings = {"type": "settings", "rotors": ["I", "II", "III"], "initial_positions": ["A", "A", "A"],
+                "ring_settings": ["A", "A", "A"], "reflector": "B"}
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("{not json")
+        assert websocket.receive_json()["type"] == "error"
+
+        websocket.send_json(settings)
+        assert websocket.receive_json()["type"] == "ready"
+        websocket.send_json({"type": "key", "text": "ab"})
+        websocket.receive_json()
+
+        websocket.send_json({"type": "backspace", "count": -1})
+        assert websocket.receive_json() == {"type": "rewind", "count": 0, "positions": "aac"}
+
+        # The connection is still usable
+        websocket.send_json({"type": "backspace", "count": 2})
+        assert websocket.receive_json() == {"type": "rewind", "count": 2, "positions": "aaa"}
+
+
+def test_metrics_count_batch_letters():
+    before = metrics.LETTERS_PROCESSED.value()
+    client.post("/api/batch", json=[batch_job("HELLO, WORLD")])
+    assert metrics.LETTERS_PROCESSED.value() - before == 10
+
+
+def test_websocket_counts_letters():
+    settings = {"type": "settings", **batch_job("")["settings"]}
+    expected = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "ab cd").process("Hi, there")
+    before = metrics.LETTERS_PROCESSED.value()
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json(settings)
+        websocket.receive_json()
+        websocket.send_json({"type": "key", "text": "Hi, there"})
+        assert websocket.receive_json()["text"] == expected
+    assert metrics.LETTERS_PROCESSED.value() - before == 7
@@ -0,0 +1,78 @@
+# test_metrics.py
+
+import unittest
+from enigma import metrics
+from enigma.machine import Enigma
+from enigma.metrics import Counter, Histogram, Registry
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter(self):
+        """
+        Counters add up per label values and cannot go down.
+        """
+        counter = Counter("errors_total", "Errors.", ("type",))
+        counter.inc(labels=("ValueError",))
+        counter.inc(2, labels=("ValueError",))
+        self.assertEqual(3, counter.value(("ValueError",)))
+        self.assertEqual(0, counter.value(("KeyError",)))
+        with self.assertRaises(ValueError):
+            counter.inc(-1)
+
+    def test_histogram_buckets(self):
+        """
+        Observations land in cumulative buckets with a count and a sum.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual([
+            ('latency_seconds_bucket', '{le="0.1"}', 2),
+            ('latency_seconds_bucket', '{le="1"}', 3),
+            ('latency_seconds_bucket', '{le="+Inf"}', 4),
+            ('latency_seconds_sum', '', 3.65),
+            ('latency_seconds_count', '', 4),
+        ], list(histogram.samples()))
+
+        with histogram.time():
+            pass
+        self.assertEqual(5, histogram.count())
+
+    def test_render(self):
+        """
+        The registry renders the Prometheus text format, with escaped label values.
+        """
+        registry = Registry()
+        counter = registry.counter("requests_total", "Requests.", ("path",))
+        counter.inc(labels=('/a"b',))
+        self.assertEqual(
+            '# HELP requests_total Requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{path="/a\\"b"} 1\n',
+            registry.render())
+        with self.assertRaises(ValueError):
+            registry.counter("requests_total", "Again.")
+
+    def test_process_counters_follow_flag(self):
+        """
+        Enigma.process only counts calls and letters while metrics are enabled.
+        """
+        enabled = metrics.enabled
+        try:
+            metrics.enable(False)
+            calls = metrics.PROCESS_CALLS.value()
+            Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").process("hello")
+            self.assertEqual(calls, metrics.PROCESS_CALLS.value())
+
+            metrics.enable()
+            letters = metrics.LETTERS_PROCESSED.value()
+            Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").process("Hello, world!")
+            self.assertEqual(calls + 1, metrics.PROCESS_CALLS.value())
+            self.assertEqual(letters + 10, metrics.LETTERS_PROCESSED.value())
+        finally:
+            metrics.enable(enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
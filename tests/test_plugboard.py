@@ -2,7 +2,7 @@
 
 import unittest
 import string
-from enigma.plugboard import Plugboard
+from enigma.plugboard import Plugboard, PlugboardHypothesis
 
 ALPHABET = string.ascii_lowercase
 
@@ -77,6 +77,55 @@ class TestPlugboard(unittest.TestCase):
             with self.assertRaises(KeyError, msg=f"Expected KeyError for invalid input '{invalid}'."):
                 plugboard.swap(invalid)
 
+    def test_wiring_is_shared_and_read_only(self):
+        """
+        Plugboards built from the same connections share one wiring whose mapping cannot be modified.
+        """
+        plugboard = Plugboard('ab cd')
+        self.assertIs(plugboard.config, Plugboard('ab cd').config)
+        self.assertEqual('ab cd', Plugboard('DC BA').connections)
+        with self.assertRaises(TypeError):
+            plugboard.mapping['a'] = 'c'
+
+    def test_hypothesis_connect_and_disconnect(self):
+        """
+        A hypothesis connects and disconnects pairs in place and reports the letters it touched.
+        """
+        hypothesis = PlugboardHypothesis('ab')
+        self.assertEqual(1, hypothesis.pairs)
+        self.assertEqual((2, 3), hypothesis.connect(2, 3))
+        self.assertEqual('ab cd', hypothesis.connections)
+        self.assertEqual((1, 0), hypothesis.disconnect(1))
+        self.assertEqual('cd', hypothesis.connections)
+        self.assertEqual(1, hypothesis.pairs)
+        with self.assertRaises(ValueError):
+            hypothesis.connect(2, 4)
+        with self.assertRaises(ValueError):
+            hypothesis.disconnect(0)
+
+    def test_hypothesis_swap(self):
+        """
+        Swapping re-pairs letters; former partners are joined or freed.
+        """
+        hypothesis = PlugboardHypothesis('ab cd')
+        self.assertEqual({0, 2, 1, 3}, set(hypothesis.swap(0, 2)))
+        self.assertEqual('ac bd', hypothesis.connections)
+        self.assertEqual({0, 4, 2}, set(hypothesis.swap(0, 4)))
+        self.assertEqual('ae bd', hypothesis.connections)
+        self.assertEqual(2, hypothesis.pairs)
+        with self.assertRaises(ValueError):
+            hypothesis.swap(0, 4)
+
+    def test_hypothesis_builds_plugboard(self):
+        """
+        A hypothesis yields an equivalent immutable Plugboard, and copies are independent.
+        """
+        hypothesis = PlugboardHypothesis('xy ab')
+        copy = hypothesis.copy()
+        copy.disconnect(0)
+        self.assertEqual(Plugboard('ab xy').table, hypothesis.plugboard().table)
+        self.assertEqual('xy', copy.plugboard().connections)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
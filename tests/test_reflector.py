@@ -87,6 +87,15 @@ class TestReflector(unittest.TestCase):
                                msg="Expected KeyError for invalid reflector type"):
             Reflector("D")  # 'D' is not a supported reflector configuration.
 
+    def test_wiring_is_shared_and_read_only(self):
+        """
+        Reflectors of the same type share one wiring whose mapping cannot be modified.
+        """
+        reflector = Reflector("B")
+        self.assertIs(reflector.config, Reflector("B").config)
+        with self.assertRaises(TypeError):
+            reflector.mapping["a"] = "b"
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
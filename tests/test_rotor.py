@@ -2,7 +2,7 @@
 
 import unittest
 import string
-from enigma.rotor import Rotor
+from enigma.rotor import Rotor, all_rotor_orders
 
 ALPHABET = string.ascii_lowercase
 
@@ -65,6 +65,57 @@ class TestRotor(unittest.TestCase):
         self.assertEqual(self.rotor.position, initial_position,
                          "Rotor did not return to the initial position after 26 rotations.")
 
+    def test_index_encoding_matches_letter_encoding(self):
+        """
+        The integer wiring tables should give the same result as the letter-based encoding
+        at every position and ring setting.
+        """
+        rotor = Rotor("IV", "a", "k")
+        for _ in range(26):
+            for index, letter in enumerate(ALPHABET):
+                self.assertEqual(ALPHABET[rotor.encode_forward_index(index)], rotor.encode_forward(letter))
+                self.assertEqual(ALPHABET[rotor.encode_backward_index(index)], rotor.encode_backward(letter))
+            rotor.rotate()
+
+    def test_wiring_is_shared_between_rotors(self):
+        """
+        Rotors of the same type share one immutable wiring object and carry no instance dict.
+        """
+        other = Rotor("I", "q", "c")
+        self.assertIs(self.rotor.config, other.config)
+        self.assertFalse(hasattr(other, "__dict__"))
+        self.assertEqual("q", other.notch)
+
+    def test_copy_has_independent_position(self):
+        """
+        A copied rotor shares the wiring but rotates independently.
+        """
+        copy = self.rotor.copy()
+        copy.rotate()
+        self.assertIs(self.rotor.config, copy.config)
+        self.assertEqual(0, self.rotor.position)
+        self.assertEqual(1, copy.position)
+
+    def test_shifted_tables_match_index_encoding(self):
+        """
+        The per-offset translation tables should agree with the index encoding.
+        """
+        rotor = Rotor("III", "a", "f")
+        for _ in range(26):
+            offset = (rotor.position - rotor.ring) % 26
+            for index in range(26):
+                self.assertEqual(rotor.encode_forward_index(index), rotor.config.shifted_forward[offset][index])
+                self.assertEqual(rotor.encode_backward_index(index), rotor.config.shifted_backward[offset][index])
+            rotor.rotate()
+
+    def test_all_rotor_orders(self):
+        """
+        Five rotors give sixty ordered choices of three.
+        """
+        orders = all_rotor_orders()
+        self.assertEqual(60, len(orders))
+        self.assertEqual(60, len(set(orders)))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,146 @@
+# test_scoring.py
+
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from enigma.scoring import NgramModel, RunningScore, letter_indices
+from enigma.vectorized import np
+
+
+class TestScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.model = NgramModel.from_text("the cat sat on the mat, then the rat ran", 3)
+
+    def test_letter_indices(self):
+        """
+        Letters become alphabet indices; everything else is dropped.
+        """
+        self.assertEqual([0, 1, 25], letter_indices("a B-z!"))
+
+    def test_table_size(self):
+        """
+        The model has one entry per n-gram and rejects tables of the wrong size.
+        """
+        self.assertEqual(26 ** 3, len(self.model.table))
+        with self.assertRaises(ValueError):
+            NgramModel(2, [0.0] * 26)
+
+    def test_language_scores_higher(self):
+        """
+        Text resembling the corpus should outscore scrambled letters of the same length.
+        """
+        self.assertGreater(self.model.score_text("the rat sat"), self.model.score_text("xqz jvk wpf"))
+
+    def test_score_sums_ngrams(self):
+        """
+        A text scores the sum of its n-gram log-probabilities.
+        """
+        table = self.model.table
+        the = (19 * 26 + 7) * 26 + 4
+        hec = (7 * 26 + 4) * 26 + 2
+        self.assertAlmostEqual(table[the] + table[hec], self.model.score_text("thec"), places=4)
+        self.assertEqual(0.0, self.model.score_text("th"))
+
+    def test_from_counts(self):
+        """
+        Frequency lines compile to the same model as the corpus they were counted from.
+        """
+        model = NgramModel.from_counts(["AB 3", "", "BA 2"])
+        self.assertEqual(2, model.n)
+        self.assertAlmostEqual(model.score_text("abab"), NgramModel.from_text("ababab", 2).score_text("abab"), places=5)
+        with self.assertRaises(ValueError):
+            NgramModel.from_counts(["ab 1", "abc 2"])
+
+    def test_save_and_load(self):
+        """
+        A saved model maps back with the same table, survives pickling by path, and
+        other files are rejected.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trigrams.bin")
+            self.model.save(path)
+            with NgramModel.load(path) as loaded:
+                self.assertEqual(3, loaded.n)
+                self.assertEqual(list(self.model.table), list(loaded.table))
+                self.assertEqual(self.model.score_text("the rat"), loaded.score_text("the rat"))
+
+                copy = pickle.loads(pickle.dumps(loaded))
+                self.assertEqual(path, copy.path)
+                self.assertEqual(list(loaded.table), list(copy.table))
+                copy.close()
+
+            with open(path, 'r+b') as file:
+                file.write(b"NOTMODEL")
+            with self.assertRaises(ValueError):
+                NgramModel.load(path)
+
+    def test_load_rejects_truncated_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trigrams.bin")
+            self.model.save(path)
+            size = os.path.getsize(path)
+            for length in (size - 4, 10, 0):
+                with open(path, 'r+b') as file:
+                    file.truncate(length)
+                with self.assertRaises(ValueError):
+                    NgramModel.load(path)
+
+    def test_delta(self):
+        """
+        Incremental rescoring matches scoring the changed text from scratch.
+        """
+        indices = letter_indices("the cat sat on the mat")
+        for changes in ({0: 1}, {5: 17, 6: 0}, {len(indices) - 1: 4}, {2: 2, 10: 25}):
+            changed = [changes.get(position, index) for position, index in enumerate(indices)]
+            self.assertAlmostEqual(self.model.score(changed) - self.model.score(indices),
+                                   self.model.delta(indices, changes), places=3)
+
+    def test_running_score(self):
+        """
+        A running score follows applied changes and predicts them with delta.
+        """
+        indices = letter_indices("the cat sat on the mat")
+        running = RunningScore(self.model, indices)
+        self.assertAlmostEqual(self.model.score(indices), running.score, places=3)
+        for changes in ({0: 1}, {5: 17, 6: 0}, {len(indices) - 1: 4}, {2: 2, 3: 19, 10: 25}):
+            changed = [changes.get(position, index) for position, index in enumerate(running.indices)]
+            expected = self.model.score(changed)
+            self.assertAlmostEqual(expected - running.score, running.delta(changes), places=3)
+            running.apply(changes)
+            self.assertEqual(changed, running.indices)
+            self.assertAlmostEqual(expected, running.score, places=3)
+        self.assertEqual(indices, letter_indices("the cat sat on the mat"))
+
+    @unittest.skipUnless(np is not None, "NumPy is not installed")
+    def test_vectorized_scores(self):
+        """
+        Array scores match score(), row by row, and windows score runs of letters.
+        """
+        indices = np.array([letter_indices("the rat sat on"), letter_indices("xqzjvkwpfmm")])
+        scores = self.model.score_array(indices)
+        for score, row in zip(scores, indices):
+            self.assertAlmostEqual(self.model.score(row.tolist()), score, places=3)
+
+        windows = self.model.window_scores(indices[0], 5)
+        self.assertEqual(len(indices[0]) - 4, len(windows))
+        self.assertAlmostEqual(self.model.score(indices[0, 2:7].tolist()), windows[2], places=3)
+        with self.assertRaises(ValueError):
+            self.model.window_scores(indices[0], 2)
+
+    def test_vectorized_scores_need_numpy(self):
+        """
+        Without NumPy, every array method raises the informative ImportError.
+        """
+        with mock.patch("enigma.vectorized.np", None), mock.patch("enigma.scoring.np", None):
+            for method, arguments in ((self.model.ngram_scores, ([0, 1, 2],)),
+                                      (self.model.score_array, ([0, 1, 2],)),
+                                      (self.model.window_scores, ([0, 1, 2, 3], 3))):
+                with self.assertRaisesRegex(ImportError, "NumPy is required"):
+                    method(*arguments)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# test_session.py
+
+import os
+import tempfile
+import unittest
+from enigma.machine import Enigma
+from enigma.session import MemorySessionStore, SQLiteSessionStore, open_session_store
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class SessionStoreTests:
+    """
+    Behaviour shared by every session store; subclasses provide make_store(clock, ttl).
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = self.make_store(self.clock, 60)
+
+    def test_continuation_matches_one_long_message(self):
+        """
+        Encrypting in parts through saved states should equal encrypting in one go.
+        """
+        expected = Enigma(["I", "II", "III"], "aaz", "bcd", "B", "ab cd").process("attack at dawn")
+
+        machine = Enigma(["I", "II", "III"], "aaz", "bcd", "B", "ab cd")
+        first = machine.process("attack ")
+        token = self.store.save(machine.snapshot())
+
+        machine = Enigma(["I", "II", "III"], "aaz", "bcd", "B", "ab cd")
+        machine.restore(self.store.load(token))
+        self.assertEqual(expected, first + machine.process("at dawn"))
+
+    def test_each_save_issues_a_new_token(self):
+        """
+        A token keeps referring to the state it was issued for.
+        """
+        machine = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "")
+        first = self.store.save(machine.snapshot())
+        machine.process("hello")
+        second = self.store.save(machine.snapshot())
+        self.assertNotEqual(first, second)
+        self.assertEqual((0, 0, 0), self.store.load(first).positions)
+        self.assertEqual((0, 0, 5), self.store.load(second).positions)
+
+    def test_states_expire(self):
+        """
+        A session should not load once its time to live has passed.
+        """
+        token = self.store.save(Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").snapshot())
+        self.clock.now += 59
+        self.assertIsNotNone(self.store.load(token))
+        self.clock.now += 1
+        self.assertIsNone(self.store.load(token))
+
+    def test_unknown_and_deleted_tokens(self):
+        token = self.store.save(Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").snapshot())
+        self.assertIsNone(self.store.load("no-such-token"))
+        self.store.delete(token)
+        self.assertIsNone(self.store.load(token))
+
+    def test_state_of_other_settings_is_rejected(self):
+        """
+        Restoring a session into a machine with a different key must fail.
+        """
+        token = self.store.save(Enigma(["I", "II", "III"], "aaa", "aaa", "B", "ab").snapshot())
+        machine = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "ac")
+        with self.assertRaises(ValueError):
+            machine.restore(self.store.load(token))
+
+
+class TestMemorySessionStore(SessionStoreTests, unittest.TestCase):
+
+    def make_store(self, clock, ttl):
+        return MemorySessionStore(maxsize=3, ttl=ttl, clock=clock)
+
+    def test_least_recently_used_session_is_evicted(self):
+        state = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").snapshot()
+        tokens = [self.store.save(state) for _ in range(3)]
+        self.store.load(tokens[0])
+        self.store.save(state)
+        self.assertEqual(3, len(self.store))
+        self.assertIsNotNone(self.store.load(tokens[0]))
+        self.assertIsNone(self.store.load(tokens[1]))
+
+
+class TestSQLiteSessionStore(SessionStoreTests, unittest.TestCase):
+
+    def make_store(self, clock, ttl):
+        return SQLiteSessionStore(":memory:", ttl=ttl, clock=clock)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_sessions_persist_across_connections(self):
+        """
+        A state saved to a database file should load from a new connection with the same key.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sessions.db")
+            machine = Enigma(["IV", "II", "V"], "qev", "bcd", "C", "ab cd")
+            machine.process("hello")
+            store = SQLiteSessionStore(path)
+            token = store.save(machine.snapshot())
+            store.close()
+
+            store = SQLiteSessionStore(path)
+            self.assertEqual(machine.snapshot(), store.load(token))
+            store.close()
+
+    def test_expired_sessions_are_purged(self):
+        state = Enigma(["I", "II", "III"], "aaa", "aaa", "B", "").snapshot()
+        self.store.save(state)
+        self.clock.now += 60
+        self.store.save(state)
+        self.assertEqual(1, len(self.store))
+
+
+class TestOpenSessionStore(unittest.TestCase):
+
+    def test_specs(self):
+        self.assertIsInstance(open_session_store("memory"), MemorySessionStore)
+        store = open_session_store("sqlite::memory:")
+        self.assertIsInstance(store, SQLiteSessionStore)
+        store.close()
+        with self.assertRaises(ValueError):
+            open_session_store("redis://localhost")
+
+
+if __name__ == '__main__':
+    unittest.main()
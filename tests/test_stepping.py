@@ -0,0 +1,71 @@
+# test_stepping.py
+
+import unittest
+from enigma.stepping import STATES, positions_after, state_index, state_positions, step_table
+from enigma.vectorized import np
+
+
+def reference_step(left, middle, right, middle_notch, right_notch):
+    # The stepping rules spelled out one press at a time
+    middle_at_notch = middle == middle_notch
+    if middle_at_notch:
+        left = (left + 1) % 26
+    if middle_at_notch or right == right_notch:
+        middle = (middle + 1) % 26
+    return left, middle, (right + 1) % 26
+
+
+class TestStepping(unittest.TestCase):
+
+    def test_single_press_follows_the_rules(self):
+        """
+        One press of positions_after from every state should follow the stepping rules.
+        """
+        for middle_notch, right_notch in ((4, 21), (16, 4), (25, 9)):
+            for state in range(STATES):
+                positions = state_positions(state)
+                self.assertEqual(reference_step(*positions, middle_notch, right_notch),
+                                 positions_after(*positions, middle_notch, right_notch, 1))
+
+    def test_many_presses_match_single_presses(self):
+        """
+        Jumping n presses ahead should land where n single presses do, across double steps.
+        """
+        positions = (0, 3, 19)
+        for count in range(1, 1500):
+            positions = reference_step(*positions, 4, 21)
+            self.assertEqual(positions, positions_after(0, 3, 19, 4, 21, count))
+        self.assertEqual((0, 3, 19), positions_after(0, 3, 19, 4, 21, 0))
+        with self.assertRaises(ValueError):
+            positions_after(0, 3, 19, 4, 21, -1)
+
+    def test_historical_double_step(self):
+        """
+        Rotors I-II-III at ADU step to ADV, AEW, BFX.
+        """
+        positions = (0, 3, 20)
+        for expected in ((0, 3, 21), (0, 4, 22), (1, 5, 23)):
+            positions = positions_after(*positions, 4, 21, 1)
+            self.assertEqual(expected, positions)
+
+    def test_step_table(self):
+        steps = step_table(4, 21)
+        for state in range(0, STATES, 7):
+            self.assertEqual(state_index(*positions_after(*state_positions(state), 4, 21, 1)), steps[state])
+
+    @unittest.skipUnless(np is not None, "NumPy is not installed")
+    def test_array_form(self):
+        """
+        The same function should work on broadcast arrays.
+        """
+        presses = np.arange(1, 2000)[None, :]
+        starts = np.array([[0], [5], [12]])
+        left, middle, right = positions_after(starts, starts + 2, starts * 2, 4, 21, presses)
+        for row, start in enumerate((0, 5, 12)):
+            for column in (0, 1, 24, 25, 649, 650, 1998):
+                self.assertEqual(positions_after(start, start + 2, start * 2, 4, 21, column + 1),
+                                 (left[row, column], middle[row, column], right[row, column]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# test_table.py
+
+import unittest
+from enigma.machine import Enigma
+from enigma.table import STATES, keystroke_table, state_index, state_positions, step_table
+
+
+class TestKeystrokeTable(unittest.TestCase):
+
+    def setUp(self):
+        self.enigma = Enigma(["II", "IV", "V"], "bqz", "cfk", "B", "ab cd ef")
+        self.table = self.enigma.keystroke_table()
+
+    def test_state_round_trip(self):
+        """
+        Packing and unpacking rotor positions should be lossless.
+        """
+        for state in (0, 1, 675, 676, 12345, STATES - 1):
+            self.assertEqual(state, state_index(*state_positions(state)))
+
+    def test_step_table_matches_step_rotors(self):
+        """
+        The step table should reproduce Enigma.step_rotors, including the double step.
+        """
+        _, middle, right = self.enigma.rotors
+        steps = step_table(middle.notch_index, right.notch_index)
+        state = state_index(*(rotor.position for rotor in self.enigma.rotors))
+        for _ in range(1000):
+            self.enigma.step_rotors()
+            state = steps[state]
+            self.assertEqual(state_positions(state), tuple(rotor.position for rotor in self.enigma.rotors))
+
+    def test_permutations_are_reciprocal(self):
+        """
+        Every per-state permutation is an involution without fixed points.
+        """
+        for state in (0, 100, 9999):
+            permutation = self.table.permutation(state)
+            for index in range(26):
+                self.assertNotEqual(index, permutation[index])
+                self.assertEqual(index, permutation[permutation[index]])
+
+    def test_tables_are_cached_by_key(self):
+        """
+        Machines with the same key share a table, whatever their start positions.
+        """
+        other = Enigma(["II", "IV", "V"], "aaa", "cfk", "B", "fe dc ba")
+        self.assertIs(self.table, other.keystroke_table())
+        self.assertIs(self.table, keystroke_table(("II", "IV", "V"), "cfk", "B", "ab cd ef"))
+
+    def test_process_with_table_matches_process(self):
+        """
+        Table-driven processing should give the same output and final positions as process().
+        """
+        text = "Attack at dawn, hold the bridge! " * 50
+        reference = Enigma(["II", "IV", "V"], "bqz", "cfk", "B", "ab cd ef")
+        self.assertEqual(reference.process(text), self.enigma.process_with_table(text))
+        self.assertEqual([rotor.position for rotor in reference.rotors],
+                         [rotor.position for rotor in self.enigma.rotors])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# test_vectorized.py
+
+import unittest
+from enigma.machine import Enigma
+from enigma.table import state_index, state_positions, step_table
+from enigma.vectorized import np, rotor_positions
+
+
+@unittest.skipUnless(np is not None, "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+
+    def make_enigma(self, positions="qdv"):
+        return Enigma(["I", "II", "III"], positions, "bxk", "C", "az by cx")
+
+    def test_rotor_positions_match_step_table(self):
+        """
+        Closed-form positions should follow the step table, including start states
+        with the middle rotor sitting on its notch.
+        """
+        _, middle, right = self.make_enigma().rotors
+        steps = step_table(middle.notch_index, right.notch_index)
+        for start in ("aaa", "adu", "aev", "zeq", "qdv"):
+            state = state_index(*("abcdefghijklmnopqrstuvwxyz".index(letter) for letter in start))
+            left_positions, middle_positions, right_positions = rotor_positions(
+                *state_positions(state), middle.notch_index, right.notch_index, 2000)
+            for press in range(2000):
+                state = steps[state]
+                self.assertEqual(state_positions(state),
+                                 (left_positions[press], middle_positions[press], right_positions[press]))
+
+    def test_process_numpy_matches_process(self):
+        """
+        The vectorized path should give the same output and final positions as process().
+        """
+        text = "The Quick Brown Fox, 1939!\n" * 100
+        reference = self.make_enigma()
+        enigma = self.make_enigma()
+        self.assertEqual(reference.process(text), enigma.process_numpy(text))
+        self.assertEqual([rotor.position for rotor in reference.rotors],
+                         [rotor.position for rotor in enigma.rotors])
+
+    def test_process_numpy_across_double_steps(self):
+        """
+        Short and long texts match process() from every middle rotor position, including
+        a middle rotor that starts on its notch and double-steps on the first letter.
+        """
+        for middle in "abcdefghijklmnopqrstuvwxyz":
+            for length in (1, 2, 27, 700):
+                text = "enigma" * (length // 6 + 1)
+                reference = Enigma(["IV", "II", "V"], "q" + middle + "z", "bxm", "B", "ab cd")
+                enigma = Enigma(["IV", "II", "V"], "q" + middle + "z", "bxm", "B", "ab cd")
+                self.assertEqual(reference.process(text[:length]), enigma.process_numpy(text[:length]))
+                self.assertEqual([rotor.position for rotor in reference.rotors],
+                                 [rotor.position for rotor in enigma.rotors])
+
+    def test_process_array(self):
+        """
+        process_array should encipher letter indices and leave the rotors where process() would.
+        """
+        reference = self.make_enigma()
+        expected = reference.process("helloworld")
+        indices = np.array(["abcdefghijklmnopqrstuvwxyz".index(letter) for letter in "helloworld"], dtype=np.uint8)
+        enigma = self.make_enigma()
+        output = enigma.process_array(indices)
+        self.assertEqual(expected, "".join("abcdefghijklmnopqrstuvwxyz"[index] for index in output))
+        self.assertEqual([rotor.position for rotor in reference.rotors],
+                         [rotor.position for rotor in enigma.rotors])
+
+    def test_empty_text(self):
+        """
+        An empty text returns an empty string and leaves the rotors untouched.
+        """
+        enigma = self.make_enigma()
+        self.assertEqual("", enigma.process_numpy(""))
+        self.assertEqual([16, 3, 21], [rotor.position for rotor in enigma.rotors])
+
+
+if __name__ == '__main__':
+    unittest.main()